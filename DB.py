@@ -1,15 +1,26 @@
 # DB.py — Aurora Pro Layout (modular routing, same-tab nav, stateful page)
 # Run: streamlit run DB.py
 
+import time
+import functools
+_T0 = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-from datetime import date
 
-# Sub-pages
-from patients_page import render as render_patients
-from appointments_page import render as render_appointments
+# Plotly and the page modules are imported lazily (see lazy.py and the ROUTER below)
+import lazy
+import compat  # noqa: F401  (asyncio/warnings shims, once per process)
+
+# Shared data pipeline (cached loader + filter engine)
+from data import load_data, dataset_version, filter_key, apply_filters
+import aggregates
+import warmup
+import timeseries
+import profiler
+import export
+
+lazy.record("core (streamlit, pandas, pipeline)", (time.perf_counter() - _T0) * 1000)
 
 # =================== PAGE ===================
 st.set_page_config(
@@ -19,26 +30,6 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-# --- Windows + older Streamlit workaround for stray asyncio RuntimeWarnings ---
-# --- Windows + older Streamlit workaround for stray asyncio RuntimeWarnings ---
-import sys, asyncio, warnings
-
-if sys.platform.startswith("win"):
-    try:
-        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    except Exception:
-        pass
-
-# Silence: "coroutine 'expire_cache' was never awaited" from streamlit.util
-warnings.filterwarnings(
-    "ignore",
-    category=RuntimeWarning,
-    module=r"streamlit\.util$",
-)
-
-
-
-
 # =================== THEME TOKENS ===================
 LIGHT = {
     "bg_grad_top": "#f6f8ff", "bg_grad_mid": "#eef3ff", "bg_grad_end": "#ffffff",
@@ -86,6 +77,9 @@ def goto(slug: str):
 # Keep URL clean/accurate every run (no effect on state)
 _qp_set(page=current_page())
 
+# Hot-path profiler: opt-in per URL, next to ?page=
+profiler.begin(_qp_get("profile") == "1", current_page())
+
 # =================== GLOBAL CSS ===================
 st.markdown(f"""
 <style>
@@ -251,6 +245,7 @@ def render_sidebar():
         ("overview",     "Overview",     "🏠"),
         ("patients",     "Patients",     "👥"),
         ("appointments", "Appointments", "📅"),
+        ("risk",         "Risk",         "⚠️"),
     ]
 
     # Brand
@@ -295,47 +290,15 @@ def render_sidebar():
 render_sidebar()
 
 # =================== DATA ===================
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_csv("noshowappointments-kagglev2-may-2016.csv")
-    except Exception:
-        rng = np.random.default_rng(13); n = 1400
-        df = pd.DataFrame({
-            "PatientId": rng.integers(1_000_000,9_999_999,n),
-            "AppointmentID": rng.integers(10_000_000,99_999_999,n),
-            "Gender": rng.choice(["F","M"], n, p=[0.65,0.35]),
-            "ScheduledDay": pd.date_range(date(2016,1,1), periods=n, freq="D", tz="UTC"),
-            "AppointmentDay": pd.date_range(date(2016,1,1), periods=n, freq="D", tz="UTC"),
-            "Age": np.clip(rng.normal(39,16,n).astype(int), 0, 95),
-            "Neighbourhood": rng.choice(["Centro","Jardim","Maria Ortiz","Sao Pedro","Resistencia","Tabuazeiro"], n),
-            "Scholarship": rng.integers(0,2,n),
-            "Hipertension": rng.integers(0,2,n, p=[0.75,0.25]),
-            "Diabetes": rng.integers(0,2,n, p=[0.85,0.15]),
-            "Alcoholism": rng.integers(0,2,n, p=[0.92,0.08]),
-            "Handcap": rng.choice([0,1], n, p=[0.93,0.07]),
-            "SMS_received": rng.integers(0,2,n, p=[0.45,0.55]),
-            "No-show": rng.choice(["No","Yes"], n, p=[0.80,0.20]),
-        })
-
-    # Normalize dtypes & drop tz (prevents tz-aware/naive subtraction issues)
-    df["ScheduledDay"] = pd.to_datetime(df["ScheduledDay"], errors="coerce")
-    df["AppointmentDay"] = pd.to_datetime(df["AppointmentDay"], errors="coerce")
-    for col in ["ScheduledDay", "AppointmentDay"]:
-        try:
-            df[col] = df[col].dt.tz_localize(None)
-        except TypeError:
-            pass
-
-    df["AppointmentDate"] = df["AppointmentDay"].dt.date
-    df["Month"] = df["AppointmentDay"].dt.to_period("M").astype(str)
-    df["Weekday"] = df["AppointmentDay"].dt.day_name()
-    df["Show"] = np.where(df["No-show"].astype(str).str.upper().eq("NO"), 1, 0)
-    df["NoShow"] = 1 - df["Show"]
-    return df
-
 DF = load_data()
 
+# Precompute aggregates for the default ribbon state + saved presets (once per process)
+warmup.start(DF)
+st.sidebar.markdown(
+    f"<div class='smallmuted' style='margin-top:12px;text-align:center'>{warmup.status_text()}</div>",
+    unsafe_allow_html=True,
+)
+
 # =================== HEADER ===================
 with st.container():
     st.markdown(
@@ -364,30 +327,35 @@ with st.container():
     st.markdown("</div></div>", unsafe_allow_html=True)
 
 # Shared filter for all pages
-mask = (DF["AppointmentDate"] >= start) & (DF["AppointmentDate"] <= end)
-if genders: mask &= DF["Gender"].isin(genders)
-if sms_sel != "All": mask &= DF["SMS_received"].eq(1 if sms_sel == "Yes" else 0)
-if nb: mask &= DF["Neighbourhood"].isin(nb)
-mask &= DF["Age"].between(*age_range)
-F = DF.loc[mask].copy()
+FILTERS = {"start": start, "end": end, "genders": genders, "sms": sms_sel, "nb": nb, "age": age_range}
+KEY = (dataset_version(DF), filter_key(FILTERS))    # disk/memory cache key for page aggregates
+with profiler.section("filter mask"):
+    F = apply_filters(DF, FILTERS)
 
 # =================== OVERVIEW (function) ===================
-def render_overview(F: pd.DataFrame, THEME: dict):
-    def sparkline(series, color):
+def render_overview(F: pd.DataFrame, THEME: dict, key=None):
+    px = lazy.load("plotly.express")
+    figures = lazy.load("figures")      # skeleton cache: px runs once per chart/theme
+
+    def sparkline(chart_id, series, color):
         s = pd.Series(series)
         if s.size == 0:
             s = pd.Series([0])
-        fig = px.area(y=s, height=90)
-        fig.update_traces(mode="lines", line_shape="spline",
-                          line_color=color, fill="tozeroy", hoverinfo="skip")
-        fig.update_xaxes(visible=False)
-        fig.update_yaxes(visible=False)
-        fig.update_layout(margin=dict(l=0, r=0, t=0, b=0),
-                          paper_bgcolor="rgba(0,0,0,0)",
-                          plot_bgcolor="rgba(0,0,0,0)")
-        return fig
+        def build(d):
+            fig = px.area(d, x="i", y="v", height=90)
+            fig.update_traces(mode="lines", line_shape="spline",
+                              line_color=color, fill="tozeroy", hoverinfo="skip")
+            fig.update_xaxes(visible=False)
+            fig.update_yaxes(visible=False)
+            fig.update_layout(margin=dict(l=0, r=0, t=0, b=0),
+                              paper_bgcolor="rgba(0,0,0,0)",
+                              plot_bgcolor="rgba(0,0,0,0)")
+            return fig
+        data = pd.DataFrame({"i": range(s.size), "v": s.to_numpy(dtype="float64")})
+        return figures.get(f"spark.{chart_id}", THEME, data, build)
 
     def kpi_with_spark(icon, value, label, series, color, delta=None, good=True):
+        profiler.open_section(f"KPI: {label}")
         d_html = ""
         if delta is not None:
             pos = (good and delta >= 0) or (not good and delta < 0)
@@ -401,34 +369,28 @@ def render_overview(F: pd.DataFrame, THEME: dict):
             f"<div class='lbl'>{label}</div></div></div>",
             unsafe_allow_html=True,
         )
-        st.plotly_chart(
-            sparkline(series, color),
-            use_container_width=True,
-            config={"displayModeBar": False},
-        )
+        fig = sparkline(label, series, color)
+        profiler.figure(fig)
+        st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
+        profiler.close_section()
 
-    trend_month = F.groupby("Month", observed=True).size()
+    A = aggregates.compute("overview", F, key)
+    trend_month = A["trend_month"]
 
     st.markdown("<div class='kpi-row'>", unsafe_allow_html=True)
     k1, k2, k3, k4 = st.columns(4)
     with k1:
-        kpi_with_spark("📅", f"{len(F):,}", "Appointments",
+        kpi_with_spark("📅", f"{A['n']:,}", "Appointments",
                        trend_month.values[-12:], THEME["primary"])
     with k2:
-        ns_rate = (F["NoShow"].mean() * 100) if len(F) else 0.0
-        rolling_ns = (1 - F["Show"].rolling(20).mean().dropna()).values[-20:]
-        kpi_with_spark("🚫", f"{ns_rate:.1f}%", "No-Show Rate",
-                       rolling_ns, THEME["warn"], good=False)
+        kpi_with_spark("🚫", f"{A['ns_rate']:.1f}%", "No-Show Rate",
+                       A["spark_ns"], THEME["warn"], good=False)
     with k3:
-        sms_pct = (F["SMS_received"].mean() * 100) if len(F) else 0.0
-        kpi_with_spark("✉️", f"{sms_pct:.0f}%", "Received SMS",
-                       F["SMS_received"].rolling(25).mean().dropna().values[-25:],
-                       THEME["accent"])
+        kpi_with_spark("✉️", f"{A['sms_pct']:.0f}%", "Received SMS",
+                       A["spark_sms"], THEME["accent"])
     with k4:
-        avg_age = (F["Age"].mean()) if len(F) else 0.0
-        kpi_with_spark("👤", f"{avg_age:.0f}", "Avg Age (yrs)",
-                       F["Age"].rolling(25).mean().dropna().values[-25:],
-                       THEME["primary2"])
+        kpi_with_spark("👤", f"{A['avg_age']:.0f}", "Avg Age (yrs)",
+                       A["spark_age"], THEME["primary2"])
     st.markdown("</div>", unsafe_allow_html=True)
 
     with st.container():
@@ -436,80 +398,95 @@ def render_overview(F: pd.DataFrame, THEME: dict):
         left, right = st.columns([2, 1])
 
         with left:
-            by_show = (
-                F["No-show"].value_counts()
-                .rename({'No': 'Show', 'Yes': 'No-Show'})
-                .reset_index()
-            )
-            by_show.columns = ["Status", "Count"]
-            fig1 = px.pie(
-                by_show,
+            profiler.open_section("Attendance Breakdown")
+            fig1 = figures.get("overview.by_show", THEME, A["by_show"], lambda d: px.pie(
+                d,
                 names="Status",
                 values="Count",
                 hole=0.72,
                 color="Status",
                 color_discrete_map={"Show": THEME["primary"], "No-Show": THEME["warn"]},
-            )
-            fig1.update_traces(textposition="inside", textinfo="percent+label", pull=[0, 0.06])
+            ).update_traces(textposition="inside", textinfo="percent+label", pull=[0, 0.06]))
             st.markdown(
                 "<div class='card pad'><div class='section-title'>Attendance Breakdown</div>",
                 unsafe_allow_html=True,
             )
+            profiler.figure(fig1)
             st.plotly_chart(fig1, use_container_width=True, config={"displayModeBar": False})
             st.markdown("</div>", unsafe_allow_html=True)
+            profiler.close_section()
 
-            trend_area = trend_month.reset_index(name="Appointments")
-            fig3 = px.area(trend_area, x="Month", y="Appointments",
-                           color_discrete_sequence=[THEME["primary"]])
-            fig3.update_traces(mode="lines", line_shape="spline")
+            profiler.open_section("Appointments Over Time")
+            trend_area = timeseries.month_to_time(trend_month.reset_index(name="Appointments"))
             st.markdown(
                 "<div class='card pad' style='margin-top:16px'><div class='section-title'>Appointments Over Time</div>",
                 unsafe_allow_html=True,
             )
-            st.plotly_chart(fig3, use_container_width=True, config={"displayModeBar": False})
+            timeseries.render_trend(
+                "trend_overview", trend_area, "Month", "Appointments", THEME["primary"], width_px=880,
+                detail=lambda s, e: timeseries.counts_by_time(F["AppointmentDay"], s, e, "Appointments"),
+            )
             st.markdown("</div>", unsafe_allow_html=True)
+            profiler.close_section()
 
         with right:
-            sms = (
-                F.groupby("SMS_received", observed=True)["NoShow"]
-                .mean().mul(100)
-                .rename({0: "No SMS", 1: "SMS Sent"})
-                .reset_index()
-            )
-            sms.columns = ["SMS", "No-Show %"]
-            fig2 = px.bar(
-                sms,
+            profiler.open_section("Effect of SMS")
+            fig2 = figures.get("overview.sms", THEME, A["sms"], lambda d: px.bar(
+                d,
                 x="SMS",
                 y="No-Show %",
                 text="No-Show %",
                 color="SMS",
                 color_discrete_sequence=[THEME["primary"], THEME["accent"]],
-            )
-            fig2.update_traces(texttemplate="%{text:.1f}%", textposition="outside", marker_line_width=0)
+            ).update_traces(texttemplate="%{text:.1f}%", textposition="outside", marker_line_width=0))
             st.markdown("<div class='card pad'><div class='section-title'>Effect of SMS</div>",
                         unsafe_allow_html=True)
+            profiler.figure(fig2)
             st.plotly_chart(fig2, use_container_width=True, config={"displayModeBar": False})
             st.markdown("</div>", unsafe_allow_html=True)
+            profiler.close_section()
 
         st.markdown("</div>", unsafe_allow_html=True)
 
-    with st.container():
+    with st.container(), profiler.section("Details"):
         st.markdown("<div class='card pad'><div class='section-title'>Details</div>", unsafe_allow_html=True)
         cols = ["AppointmentID","PatientId","AppointmentDate","Gender","Age","Neighbourhood","SMS_received","Scholarship","No-show"]
         st.dataframe(F[cols].head(250), use_container_width=True, hide_index=True)
+
+        # Export runs only on click, on a Streamlit worker thread, chunked to a temp file (export.py)
+        with st.expander(f"⬇️ Export selection ({len(F):,} rows)"):
+            e1, e2, e3, e4 = st.columns([3, 2, 1, 1])
+            ex_cols = e1.multiselect("Columns", export.columns(DF), default=cols)
+            sort_by = e2.selectbox("Sort by", ["(none)"] + ex_cols)
+            fmt = e3.selectbox("Format", list(export.FORMATS))
+            desc = e4.toggle("Descending", disabled=sort_by == "(none)")
+            st.download_button(
+                "Download",
+                data=functools.partial(export.export_file, DF, dict(FILTERS), ex_cols, fmt,
+                                       None if sort_by == "(none)" else sort_by, not desc),
+                file_name=export.file_name(FILTERS, fmt),
+                mime=export.FORMATS[fmt][1],
+                on_click="ignore",
+                disabled=not ex_cols or not len(F),
+            )
         st.markdown("</div>", unsafe_allow_html=True)
 
 # =================== ROUTER ===================
+# Page modules are imported on first visit (then served from sys.modules)
+PAGE_MODULES = {"patients": "patients_page", "appointments": "appointments_page", "risk": "risk_page"}
+
 page = current_page()
-if page == "patients":
-    render_patients(F, THEME)
-elif page == "appointments":
-    render_appointments(F, THEME)
-else:
-    render_overview(F, THEME)
+with profiler.section(f"page: {page}"):
+    if page in PAGE_MODULES:
+        lazy.load(PAGE_MODULES[page]).render(F, THEME, KEY)
+    else:
+        render_overview(F, THEME, KEY)
 
 # =================== FOOTER & TOGGLES ===================
-st.markdown("<div class='smallmuted' style='text-align:center;padding:14px'>Aurora Layout • unified CSS • same-tab nav • stateful theme</div>", unsafe_allow_html=True)
+st.markdown(f"<div class='smallmuted' style='text-align:center;padding:14px'>Aurora Layout • unified CSS • same-tab nav • stateful theme • {lazy.report()}</div>", unsafe_allow_html=True)
+
+# ?profile=1 → per-rerun timings, figure sizes and cache counters (+ JSON-lines export)
+profiler.render_panel()
 
 # =============== THEME TOGGLE (preserve current page) ===============
 if st.button("🌙 Dark" if not st.session_state.dark else "☀️ Light"):
@@ -1,8 +1,13 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import plotly.express as px
 
+import compat  # noqa: F401  (asyncio/warnings shims, once per process)
+
+# Same cached loader, filter engine and aggregate caches as DB.py
+from data import load_data, default_filters, dataset_version, filter_key, apply_filters, CONDITIONS
+import aggregates
+import figures
+
 # ======================
 # Page Config
 # ======================
@@ -15,18 +20,33 @@ st.set_page_config(
 # ======================
 # Load Data
 # ======================
-df = pd.read_csv("noshowappointments-kagglev2-may-2016.csv")
+# memory -> disk cache -> CSV parse, once per process (not on every widget interaction)
+df = load_data()
 
 # ======================
 # Sidebar Controls
 # ======================
 st.sidebar.title('Controllers')
 st.sidebar.markdown('-----')
-FilterByGender = st.sidebar.multiselect("select Gender : ",options=df['Gender'].unique())
-medical_condition_filter = st.sidebar.multiselect("select medical condition",options=['Hipertension','Diabetes','Handcap','Alcoholism','non','ALL'])
+FilterByGender = st.sidebar.multiselect("select Gender : ",options=sorted(df['Gender'].dropna().unique()))
+medical_condition_filter = st.sidebar.multiselect("select medical condition",options=list(CONDITIONS) + ['non','ALL'])
 age_filter = st.sidebar.slider("Select Age Range:", int(df['Age'].min()), int(df['Age'].max()), (0, 100))
 sms_filter = st.sidebar.radio("SMS Reminder:", ["All", "Yes", "No"])
 No_Show_filter = st.sidebar.radio("missed  appointment : ",["ALL","Yes",'No'])
+
+# Conditions match any selected flag (CondMask bitmask); 'non' = no condition, 'ALL' = no filter
+filters = {
+    **default_filters(df),
+    "genders": tuple(FilterByGender),
+    "sms": sms_filter,
+    "age": age_filter,
+    "conditions": tuple(medical_condition_filter),
+    "noshow": No_Show_filter,
+}
+key = (dataset_version(df), filter_key(filters))
+F = apply_filters(df, filters)
+A = aggregates.compute("insights", F, key)
+
 # ======================
 # Custom CSS
 # ======================
@@ -58,14 +78,59 @@ st.markdown("""
 st.markdown("<h2 style='color:#0074c2;'>No-Show Insights: Understanding Patient Appointment Behavior</h2>", unsafe_allow_html=True)
 st.markdown("##### Explore patterns and insights behind patient appointment attendance.")
 
+if not len(F):
+    st.info("No appointments match the selected filters.")
+    st.stop()
+
 # ======================
 # KPI Section
 # ======================
+def kpi(col, value, label):
+    col.markdown(f"<div class='kpi-card'><div class='kpi-number'>{value}</div><div>{label}</div></div>", unsafe_allow_html=True)
+
+k1, k2, k3, k4, k5 = st.columns(5)
+kpi(k1, f"{A['n']:,}", "Appointments")
+kpi(k2, f"{A['patients']:,}", "Patients")
+kpi(k3, f"{A['ns_rate']:.1f}%", "No-show rate")
+kpi(k4, f"{A['sms_pct']:.1f}%", "SMS reminders")
+kpi(k5, f"{A['avg_age']:.1f}", "Average age")
+st.markdown("")
 
 # ======================
 # Visualization Section
 # ======================
+# px builds each chart once; later reruns only patch the data arrays (figures.py)
+def chart(chart_id, data, build):
+    fig = figures.get(f"insights.{chart_id}", {}, data,
+                      lambda d: build(d).update_layout(margin=dict(l=0, r=0, t=30, b=0)))
+    st.plotly_chart(fig, use_container_width=True)
+
+c1, c2 = st.columns([2, 1])
+with c1:
+    chart("trend", A["trend_month"], lambda d: px.line(d, x="Month", y="Appointments", markers=True,
+                                                       title="Appointments per month"))
+with c2:
+    chart("by_show", A["by_show"], lambda d: px.pie(d, names="Status", values="Count", hole=0.5, title="Show vs No-show",
+                                                    color_discrete_sequence=["#0074c2", "#f59e0b"]))
+
+c1, c2 = st.columns(2)
+with c1:
+    chart("ns_condition", A["ns_condition"], lambda d: px.bar(d, x="Condition", y="No-Show %", hover_data=["Appointments"],
+                                                              title="No-show rate by medical condition"))
+with c2:
+    chart("ns_agebin", A["ns_agebin"], lambda d: px.bar(d, x="AgeBin", y="No-Show %", title="No-show rate by age group"))
+
+c1, c2 = st.columns(2)
+with c1:
+    chart("ns_sms", A["ns_sms"], lambda d: px.bar(d, x="SMS", y="No-Show %", title="No-show rate by SMS reminder"))
+with c2:
+    chart("ns_gender", A["ns_gender"], lambda d: px.bar(d, x="Gender", y="No-Show %", title="No-show rate by gender"))
 
 # ======================
 # Data Table
 # ======================
+st.markdown("#### Appointments")
+cols = ["PatientId", "AppointmentID", "Gender", "Age", "Neighbourhood", "AppointmentDate",
+        *CONDITIONS, "SMS_received", "No-show"]
+st.dataframe(F[cols].head(500), use_container_width=True, hide_index=True)
+st.caption(f"Showing {min(len(F), 500):,} of {len(F):,} matching appointments.")
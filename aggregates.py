@@ -0,0 +1,435 @@
+# aggregates.py — per-page aggregates (pure pandas, no Streamlit)
+#
+# Each page declares its aggregates as independent tasks (name -> fn(F)) and
+# asks for them via compute(page, F, key). Tasks run concurrently on a shared
+# thread pool. With a key (dataset version + filter key) results are served
+# from an in-process LRU, then from the on-disk cache, and only computed when
+# both miss.
+
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+from disk_cache import CACHE
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+AGE_BINS = [0, 12, 18, 35, 50, 65, 120]
+AGE_LABELS = ["Child", "Teen", "18-35", "36-50", "51-65", "65+"]
+CONDITIONS = ["Hipertension", "Diabetes", "Handcap", "Alcoholism"]
+
+
+def _hist(values, nbins: int = 30) -> pd.DataFrame:
+    """Pre-binned histogram (bin centre, count) so charts never ship raw rows."""
+    values = np.asarray(values, dtype="float64")
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return pd.DataFrame({"Bin": [], "Count": []})
+    counts, edges = np.histogram(values, bins=nbins)
+    # px.bar centres each bar on its x value
+    return pd.DataFrame({"Bin": (edges[:-1] + edges[1:]) / 2, "Count": counts})
+
+
+def _age_bins(F: pd.DataFrame):
+    return pd.cut(F["Age"], bins=AGE_BINS, labels=AGE_LABELS)
+
+
+def _lead_days(F: pd.DataFrame) -> pd.Series:
+    appt, sched = F["AppointmentDay"], F["ScheduledDay"]
+    # If the series has timezone info, drop it safely
+    if getattr(appt.dt, "tz", None) is not None:
+        appt = appt.dt.tz_localize(None)
+    if getattr(sched.dt, "tz", None) is not None:
+        sched = sched.dt.tz_localize(None)
+    lead = (appt - sched).dt.days.dropna()
+    return lead[lead >= 0]
+
+
+# =================== OVERVIEW ===================
+def _tail(F: pd.DataFrame) -> pd.DataFrame:
+    # Rolling sparklines only ever show the last ~25 points: roll over the tail, not all of F
+    return F.tail(64)
+
+
+def _by_show(F: pd.DataFrame) -> pd.DataFrame:
+    by_show = (
+        F["No-show"].value_counts()
+        .rename({'No': 'Show', 'Yes': 'No-Show'})
+        .reset_index()
+    )
+    by_show.columns = ["Status", "Count"]
+    return by_show
+
+
+def _ns_by_sms(F: pd.DataFrame) -> pd.DataFrame:
+    sms = (
+        F.groupby("SMS_received", observed=True)["NoShow"]
+        .mean().mul(100)
+        .rename({0: "No SMS", 1: "SMS Sent"})
+        .reset_index()
+    )
+    sms.columns = ["SMS", "No-Show %"]
+    return sms
+
+
+OVERVIEW = {
+    "n": len,
+    "ns_rate": lambda F: F["NoShow"].mean() * 100,
+    "sms_pct": lambda F: F["SMS_received"].mean() * 100,
+    "avg_age": lambda F: F["Age"].mean(),
+    "trend_month": lambda F: F.groupby("Month", observed=True).size(),
+    "spark_ns": lambda F: (1 - _tail(F)["Show"].rolling(20).mean().dropna()).values[-20:],
+    "spark_sms": lambda F: _tail(F)["SMS_received"].rolling(25).mean().dropna().values[-25:],
+    "spark_age": lambda F: _tail(F)["Age"].rolling(25).mean().dropna().values[-25:],
+    "by_show": _by_show,
+    "sms": _ns_by_sms,
+}
+OVERVIEW_EMPTY = {
+    "n": 0, "ns_rate": 0.0, "sms_pct": 0.0, "avg_age": 0.0,
+    "trend_month": pd.Series(dtype="int64", index=pd.Index([], name="Month")),
+    "spark_ns": np.array([]), "spark_sms": np.array([]), "spark_age": np.array([]),
+    "by_show": pd.DataFrame({"Status": [], "Count": []}),
+    "sms": pd.DataFrame({"SMS": [], "No-Show %": []}),
+}
+
+
+# =================== PATIENTS ===================
+def _gender_split(F: pd.DataFrame) -> pd.DataFrame:
+    g = F["Gender"].value_counts().reset_index()
+    g.columns = ["Gender", "Count"]
+    return g
+
+
+def _ns_by_agebin(F: pd.DataFrame) -> pd.DataFrame:
+    ns = F.groupby(_age_bins(F), observed=True)["NoShow"].mean().mul(100).reset_index()
+    ns.columns = ["AgeBin", "No-Show %"]
+    return ns
+
+
+def _ns_by_gender(F: pd.DataFrame) -> pd.DataFrame:
+    ns_g = F.groupby("Gender", observed=True)["NoShow"].mean().mul(100).reset_index()
+    ns_g.columns = ["Gender", "No-Show %"]
+    return ns_g
+
+
+def _top_nb_patients(F: pd.DataFrame) -> pd.DataFrame:
+    nb = (F.groupby("Neighbourhood", observed=True)["PatientCode"].nunique()
+            .sort_values(ascending=False).head(15).reset_index())
+    nb.columns = ["Neighbourhood", "Patients"]
+    return nb
+
+
+def _heatmap(F: pd.DataFrame) -> pd.DataFrame:
+    return (F.assign(AgeBin=_age_bins(F))
+              .groupby(["AgeBin", "Weekday"], observed=True)["NoShow"]
+              .mean().mul(100).unstack().reindex(columns=WEEKDAYS))
+
+
+PATIENTS = {
+    "n": len,
+    "patients": lambda F: F["PatientCode"].nunique(),
+    "female": lambda F: F["Gender"].eq("F").mean() * 100,
+    "med_age": lambda F: F["Age"].median(),
+    "top_nb": lambda F: F["Neighbourhood"].mode().iloc[0],
+    "age_hist": lambda F: _hist(F["Age"]),
+    "gender": _gender_split,
+    "ns_agebin": _ns_by_agebin,
+    "ns_gender": _ns_by_gender,
+    "top_nb_patients": _top_nb_patients,
+    "heatmap": _heatmap,
+}
+PATIENTS_EMPTY = {"n": 0, "patients": 0, "female": 0, "med_age": 0, "top_nb": "—"}
+
+
+# =================== APPOINTMENTS ===================
+def _weekday_counts(F: pd.DataFrame) -> pd.DataFrame:
+    w = (
+        F["Weekday"].value_counts()
+        .reindex(WEEKDAYS)
+        .dropna()
+        .astype(int)
+        .reset_index()
+    )
+    w.columns = ["Weekday", "Appointments"]
+    return w
+
+
+def _ns_by_weekday(F: pd.DataFrame) -> pd.DataFrame:
+    ns_w = (
+        F.groupby("Weekday", observed=True)["NoShow"]
+        .mean()
+        .mul(100)
+        .reindex(WEEKDAYS)
+        .reset_index()
+    )
+    ns_w.columns = ["Weekday", "No-Show %"]
+    return ns_w
+
+
+def _ns_by_neighbourhood(F: pd.DataFrame) -> pd.DataFrame:
+    ns_nb = (
+        F.groupby("Neighbourhood", observed=True)["NoShow"]
+        .mean()
+        .mul(100)
+        .sort_values(ascending=False)
+        .head(12)
+        .reset_index()
+    )
+    ns_nb.columns = ["Neighbourhood", "No-Show %"]
+    return ns_nb
+
+
+def _avg_lead(F: pd.DataFrame) -> float:
+    lead = _lead_days(F)
+    return float(lead.mean()) if len(lead) else 0.0
+
+
+APPOINTMENTS = {
+    "n": len,
+    "show_rate": lambda F: F["Show"].mean() * 100,
+    "avg_lead": _avg_lead,
+    "sms_pct": lambda F: F["SMS_received"].mean() * 100,
+    "lead_hist": lambda F: _hist(_lead_days(F)),
+    "weekday": _weekday_counts,
+    "month": lambda F: F.groupby("Month", observed=True).size().reset_index(name="Appointments"),
+    "ns_sms": _ns_by_sms,
+    "ns_weekday": _ns_by_weekday,
+    "ns_nb": _ns_by_neighbourhood,
+}
+APPOINTMENTS_EMPTY = {"n": 0, "show_rate": 0, "avg_lead": 0.0, "sms_pct": 0, "lead_hist": _hist([])}
+
+
+# =================== COHORTS ===================
+def _visit_distribution(F: pd.DataFrame) -> pd.DataFrame:
+    counts = np.bincount(F["PatientCode"].to_numpy())
+    counts = counts[counts > 0]
+    vc = pd.Series(counts).value_counts().sort_index().head(10).reset_index()
+    vc.columns = ["Visits", "Patients"]
+    return vc
+
+
+def _new_by_month(F: pd.DataFrame) -> pd.DataFrame:
+    first_month = (
+        F.sort_values("AppointmentDay", kind="stable")
+        .drop_duplicates("PatientCode")["Month"]
+        .value_counts()
+        .sort_index()
+        .reset_index()
+    )
+    first_month.columns = ["Month", "New patients"]
+    return first_month
+
+
+COHORTS = {
+    "n": len,
+    "visits": _visit_distribution,
+    "new_by_month": _new_by_month,
+}
+COHORTS_EMPTY = {"n": 0}
+
+
+# =================== INSIGHTS (Dashboard.py) ===================
+def _ns_by_condition(F: pd.DataFrame) -> pd.DataFrame:
+    ns = F["NoShow"].to_numpy()
+    masks = {c: F[c].to_numpy() > 0 for c in CONDITIONS}
+    masks["None"] = F["CondMask"].to_numpy() == 0
+    rows = [(name, int(m.sum()), ns[m].mean() * 100 if m.any() else np.nan) for name, m in masks.items()]
+    return pd.DataFrame(rows, columns=["Condition", "Appointments", "No-Show %"])
+
+
+INSIGHTS = {
+    "n": len,
+    "patients": lambda F: F["PatientCode"].nunique(),
+    "ns_rate": lambda F: F["NoShow"].mean() * 100,
+    "sms_pct": lambda F: F["SMS_received"].mean() * 100,
+    "avg_age": lambda F: F["Age"].mean(),
+    "trend_month": lambda F: F.groupby("Month", observed=True).size().reset_index(name="Appointments"),
+    "by_show": _by_show,
+    "ns_gender": _ns_by_gender,
+    "ns_agebin": _ns_by_agebin,
+    "ns_sms": _ns_by_sms,
+    "ns_condition": _ns_by_condition,
+}
+INSIGHTS_EMPTY = {"n": 0, "patients": 0, "ns_rate": 0.0, "sms_pct": 0.0, "avg_age": 0.0}
+
+
+# =================== RISK (risk_page.py) ===================
+def _risk_summary(F: pd.DataFrame) -> dict:
+    import risk         # risk imports this module (shared age bins)
+    from data import dataset_version
+    # F's version (kept in attrs by every slice): a memory hit, primed by risk_page on the script thread
+    return risk.summarize(F, risk.get_model(version=dataset_version(F)))
+
+
+# One task: every summary needs the same per-row scores
+RISK = {"summary": _risk_summary}
+RISK_EMPTY = {}
+
+
+# Each page declares its aggregates as independent tasks: name -> fn(F)
+PAGES = {
+    "overview": (OVERVIEW, OVERVIEW_EMPTY),
+    "patients": (PATIENTS, PATIENTS_EMPTY),
+    "appointments": (APPOINTMENTS, APPOINTMENTS_EMPTY),
+    "cohorts": (COHORTS, COHORTS_EMPTY),
+    "insights": (INSIGHTS, INSIGHTS_EMPTY),
+    "risk": (RISK, RISK_EMPTY),
+}
+
+# =================== EXECUTION ===================
+# Threads, not processes: F would have to be pickled to every worker, and the
+# heavy parts (groupby/hash/sort kernels) release the GIL anyway.
+WORKERS = min(8, os.cpu_count() or 1)
+_POOL = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="aggregates")
+
+# Background work (warmup.py) gets its own small pool of niced threads, so it
+# never queues ahead of a page's tasks in _POOL.
+BG_WORKERS = max(1, WORKERS // 4)
+
+
+def _lower_priority():
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)    # Linux: per thread
+    except (AttributeError, OSError):
+        pass
+
+
+_BG_POOL = ThreadPoolExecutor(max_workers=BG_WORKERS, thread_name_prefix="aggregates-bg",
+                              initializer=_lower_priority)
+
+
+class PageAggregates(Mapping):
+    """Aggregates still being computed; A[name] blocks until that task finishes.
+
+    Pages read values in layout order, so each card renders as soon as its own
+    aggregate is ready while the rest keep running in the pool.
+    """
+
+    def __init__(self, page: str, F: pd.DataFrame, pool, on_done=None):
+        self._tasks, _ = PAGES[page]
+        self._F = F
+        self._on_done = on_done
+        self._lock = threading.RLock()
+        self._remaining = len(self._tasks)
+        self._failed = False
+        self.finished = False
+        self._futures = {}
+        self._background = set()        # names whose future is queued on _BG_POOL
+        for name in self._tasks:
+            self._run(name, pool)
+
+    def _run(self, name, pool):
+        future = pool.submit(self._tasks[name], self._F)
+        self._futures[name] = future
+        if pool is _BG_POOL:
+            self._background.add(name)
+        else:
+            self._background.discard(name)
+        future.add_done_callback(self._one_done)
+
+    def _one_done(self, future):
+        if future.cancelled():          # moved to another pool by promote()
+            return
+        with self._lock:
+            self._remaining -= 1
+            self._failed |= future.exception() is not None
+            last = self._remaining == 0
+            self.finished = last
+        if last and self._on_done is not None:
+            self._on_done(None if self._failed else {name: f.result() for name, f in self._futures.items()})
+
+    def promote(self):
+        """Move tasks that haven't started yet from the background pool to _POOL."""
+        with self._lock:
+            for name in list(self._background):
+                if self._futures[name].cancel():
+                    self._run(name, _POOL)
+                else:                       # already running: stays where it is
+                    self._background.discard(name)
+
+    def __getitem__(self, name):
+        while True:
+            future = self._futures[name]
+            try:
+                return future.result()
+            except CancelledError:
+                # promote() cancelled it to resubmit on _POOL: wait for the replacement
+                with self._lock:
+                    if self._futures[name] is future:
+                        raise
+
+    def __iter__(self):
+        return iter(self._futures)
+
+    def __len__(self):
+        return len(self._futures)
+
+
+# =================== CACHE ===================
+_MEM_MAX = 64
+_MEM: "OrderedDict[tuple, dict]" = OrderedDict()
+_INFLIGHT: "dict[tuple, PageAggregates]" = {}       # misses being computed, joined by identical requests
+_MEM_LOCK = threading.RLock()
+STATS = {"mem_hit": 0, "disk_hit": 0, "miss": 0, "joined": 0}     # read by profiler.py
+
+
+def _remember(mem_key, result: dict):
+    with _MEM_LOCK:
+        _MEM[mem_key] = result
+        _MEM.move_to_end(mem_key)
+        while len(_MEM) > _MEM_MAX:
+            _MEM.popitem(last=False)
+
+
+def compute(page: str, F: pd.DataFrame, key=None, background: bool = False) -> Mapping:
+    """Aggregates for `page`; `key` = (dataset version, filter key) enables caching.
+
+    Cache hits return a plain dict; misses return a PageAggregates whose tasks
+    run concurrently and are written to the caches once all of them succeed.
+    A request for a key that is already being computed joins that computation.
+    background=True (warm-up) runs a miss on the low-priority pool; an
+    interactive request joining it pulls its pending tasks back onto _POOL.
+    """
+    _, empty = PAGES[page]
+    if not len(F):
+        return empty
+    pool = _BG_POOL if background else _POOL
+    if key is None:
+        return PageAggregates(page, F, pool)
+    mem_key = (page, key)
+    with _MEM_LOCK:
+        if mem_key in _MEM:
+            STATS["mem_hit"] += 1
+            _MEM.move_to_end(mem_key)
+            return _MEM[mem_key]
+    _missing = object()
+    result = CACHE.get(f"agg-{page}", key, _missing)
+    if result is not _missing:
+        STATS["disk_hit"] += 1
+        _remember(mem_key, result)
+        return result
+
+    def store(result):
+        if result is not None:
+            _remember(mem_key, result)
+            CACHE.set(f"agg-{page}", key, result)
+        with _MEM_LOCK:
+            _INFLIGHT.pop(mem_key, None)
+
+    with _MEM_LOCK:
+        # re-check: join a computation of this key that's already running
+        running = _INFLIGHT.get(mem_key)
+        if running is None:
+            STATS["miss"] += 1
+            running = PageAggregates(page, F, pool, on_done=store)
+            if not running.finished:        # (tiny pages can finish before we get here)
+                _INFLIGHT[mem_key] = running
+            return running
+    STATS["joined"] += 1
+    if not background:
+        running.promote()
+    return running
@@ -0,0 +1,198 @@
+# benchmark.py — headless benchmark suite for the dashboard render paths
+#
+#   python benchmark.py                     # 10k + 1m rows, compare with bench_baseline.json
+#   python benchmark.py --rows 10m 50m      # bigger synthetic datasets (see synth.py)
+#   python benchmark.py --update            # write/refresh the baseline from this run
+#
+# Each dataset size runs in its own subprocess (fresh caches, clean peak RSS).
+# Stages: load_data (generate + normalize), the filter mask, every page's
+# aggregates per tab, and a full headless render of each page through
+# Streamlit's AppTest (cold = empty aggregate caches, warm = rerun), with
+# the serialized payload of everything the page emitted. Exit status is 1
+# if any metric regresses past its tolerance against the stored baseline, or
+# if there is no baseline to compare with (unless --update).
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "bench_baseline.json")
+
+# Relative slack per metric kind (+ a small absolute floor for tiny timings)
+TOLERANCE = {"_s": (0.30, 0.02), "_mb": (0.20, 2.0), "_bytes": (0.10, 512)}
+
+# Which aggregate tasks feed which tab (aggregates.py task names)
+TABS = {
+    "overview": {"Overview": None},
+    "patients": {
+        "Overview": ["patients", "female", "med_age", "top_nb", "age_hist", "gender"],
+        "Demographics": ["ns_agebin", "ns_gender"],
+        "Geography": ["top_nb_patients"],
+        "Outcomes": ["heatmap"],
+    },
+    "appointments": {
+        "Volume & Timing": ["show_rate", "avg_lead", "sms_pct", "lead_hist", "weekday", "month"],
+        "Quality (No-show)": ["ns_sms", "ns_weekday", "ns_nb"],
+    },
+    "cohorts": {"Cohorts": None},
+}
+
+
+def _timed(fn, memory: bool):
+    t0 = time.perf_counter()
+    out = fn()
+    secs = time.perf_counter() - t0
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return out, secs, peak_mb
+
+
+def _payload_bytes(node) -> int:
+    total = 0
+    proto = getattr(node, "proto", None)
+    if proto is not None and hasattr(proto, "ByteSize"):
+        total += proto.ByteSize()
+    for child in getattr(node, "children", {}).values():
+        total += _payload_bytes(child)
+    return total
+
+
+def run_size(rows: int, memory: bool) -> dict:
+    """Benchmark one dataset size in this process (called via --worker)."""
+    cache_dir = tempfile.mkdtemp(prefix="dash-bench-")
+    os.environ.update(DASHBOARD_CSV="", DASHBOARD_SYNTH_ROWS=str(rows),
+                      DASHBOARD_CACHE_DIR=cache_dir, DASHBOARD_WARMUP="0")
+    sys.path.insert(0, HERE)
+    import synth, data, aggregates
+    from streamlit.testing.v1 import AppTest
+
+    m = {}
+
+    def record(name, secs, peak_mb=None):
+        m[f"{name}_s"] = round(secs, 4)
+        if peak_mb is not None:
+            m[f"{name}_mb"] = round(peak_mb, 1)
+
+    DF, secs, peak = _timed(lambda: data.normalize(synth.generate(rows, seed=13)), memory)
+    record("load_data", secs, peak)
+
+    base = data.default_filters(DF)
+    narrow = {**base, "sms": "Yes", "nb": list(synth.NEIGHBOURHOODS[:3]), "age": (18, 65)}
+    for label, flt in (("default", base), ("narrow", narrow)):
+        _, secs, peak = _timed(lambda: data.apply_filters(DF, flt), memory)
+        record(f"filter_mask.{label}", secs, peak)
+
+    for page, tabs in TABS.items():
+        tasks, _ = aggregates.PAGES[page]
+        for tab, names in tabs.items():
+            names = names or list(tasks)
+            _, secs, _ = _timed(lambda: [tasks[n](DF) for n in names], False)
+            record(f"aggregates.{page}.{tab}", secs)
+        _, secs, peak = _timed(lambda: dict(aggregates.compute(page, DF)), memory)
+        record(f"aggregates.{page}.concurrent", secs, peak)
+
+    # Full headless renders through the real DB.py entry point
+    at = AppTest.from_file(os.path.join(HERE, "DB.py"), default_timeout=3600)
+    t0 = time.perf_counter()
+    at.run()
+    record("render.first_run", time.perf_counter() - t0)      # includes load_data + cache fill
+    for page in ("overview", "patients", "appointments", "risk"):
+        aggregates._MEM.clear()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        at.session_state.page = page
+        for phase in ("cold", "warm"):
+            t0 = time.perf_counter()
+            at.run()
+            record(f"render.{page}.{phase}", time.perf_counter() - t0)
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].value}")
+        m[f"render.{page}.payload_bytes"] = _payload_bytes(at.main) + _payload_bytes(at.sidebar)
+
+    try:
+        import resource
+        m["process.peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:       # Windows
+        pass
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return m
+
+
+def compare(current: dict, baseline: dict) -> list:
+    failures = []
+    for size, metrics in current.items():
+        if size not in baseline:
+            failures.append(f"{size}: no baseline for this size (run with --update to record one)")
+            continue
+        for name, value in metrics.items():
+            ref = baseline[size].get(name)
+            if ref is None:
+                continue
+            rel, floor = next((v for k, v in TOLERANCE.items() if name.endswith(k)), (0.30, 0))
+            if value > ref * (1 + rel) + floor:
+                failures.append(f"{size} {name}: {value} > baseline {ref} (+{rel:.0%})")
+    return failures
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", nargs="+", default=["10k", "1m"], help="dataset sizes, e.g. 10k 1m 10m 50m")
+    ap.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--worker", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.worker:
+        import synth
+        print(json.dumps(run_size(synth.parse_rows(args.worker), not args.no_memory)))
+        return 0
+    # Nothing to compare against is a failure, not a pass: checked before the (slow) runs
+    if not args.update and not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --update to create one", file=sys.stderr)
+        return 1
+
+    results = {}
+    for size in args.rows:
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", size]
+        if args.no_memory:
+            cmd.append("--no-memory")
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            return proc.returncode
+        results[size] = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"== {size} rows")
+        for name, value in results[size].items():
+            print(f"  {name:<45} {value}")
+
+    if args.update:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as fh:
+                baseline = json.load(fh)
+        baseline.update(results)
+        with open(args.baseline, "w") as fh:
+            json.dump(baseline, fh, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as fh:
+        failures = compare(results, json.load(fh))
+    for f in failures:
+        print("REGRESSION", f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+# compat.py — process-wide runtime shims, installed once on first import
+# (previously copy-pasted into DB.py and every page module)
+
+# --- Windows + older Streamlit workaround for stray asyncio RuntimeWarnings ---
+import sys, asyncio, warnings
+
+if sys.platform.startswith("win"):
+    try:
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    except Exception:
+        pass
+
+# Silence: "coroutine 'expire_cache' was never awaited" from streamlit.util
+warnings.filterwarnings(
+    "ignore",
+    category=RuntimeWarning,
+    module=r"streamlit\.util$",
+)
+
+warnings.simplefilter("ignore", RuntimeWarning)
@@ -0,0 +1,160 @@
+# crossfilter.py — linked cross-filters from chart selections (click / box)
+#
+# A selectable chart (the neighbourhood bar, the AgeBin×Weekday heatmap) writes
+# its selection to st.session_state["xf_<page>"]; every other chart on that page
+# is then aggregated from just the selected slice of F. The slice comes from a
+# per-(filter key, dimension) inverted index — rows grouped by code, so picking
+# values is a few contiguous ranges — instead of re-masking all of F with string
+# comparisons. The selecting chart itself keeps the cached unfiltered aggregates
+# (it is the control), and slice aggregates are cached under key + selection.
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import aggregates
+
+LABELS = {"nb": "Neighbourhood", "cell": "AgeBin × Weekday"}
+_MAX = 8
+
+_INDEX: "OrderedDict[tuple, dict]" = OrderedDict()
+_LOCK = threading.Lock()
+
+
+# =================== INDEX ===================
+def _codes(F: pd.DataFrame, dim: str):
+    """Integer code per row (-1 = not selectable) and the label of each code."""
+    if dim == "nb":
+        codes, uniques = pd.factorize(F["Neighbourhood"], use_na_sentinel=True)
+        return codes.astype(np.int64), [str(u) for u in uniques]
+    if dim == "cell":
+        # same bins as the heatmap (aggregates._age_bins: NaN outside AGE_BINS -> -1)
+        age = aggregates._age_bins(F).cat.codes.to_numpy().astype(np.int64)
+        wd = pd.Categorical(F["Weekday"], categories=aggregates.WEEKDAYS).codes.astype(np.int64)
+        codes = np.where((age >= 0) & (wd >= 0), age * len(aggregates.WEEKDAYS) + wd, -1)
+        labels = [(a, w) for a in aggregates.AGE_LABELS for w in aggregates.WEEKDAYS]
+        return codes, labels
+    raise KeyError(dim)
+
+
+def _build(F: pd.DataFrame, dim: str) -> dict:
+    codes, labels = _codes(F, dim)
+    order = np.argsort(codes, kind="stable")                    # rows grouped by code, -1 first
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes + 1, minlength=len(labels) + 1))])
+    return {"codes": codes, "order": order, "offsets": offsets,
+            "lookup": {label: i for i, label in enumerate(labels)}}
+
+
+def _index(F: pd.DataFrame, key, dim: str) -> dict:
+    if key is None:
+        return _build(F, dim)
+    ikey = (key, dim)
+    with _LOCK:
+        if ikey in _INDEX:
+            _INDEX.move_to_end(ikey)
+            return _INDEX[ikey]
+    index = _build(F, dim)
+    with _LOCK:
+        _INDEX[ikey] = index
+        while len(_INDEX) > _MAX:
+            _INDEX.popitem(last=False)
+    return index
+
+
+def rows(F: pd.DataFrame, key, selection: dict):
+    """Sorted row positions of F matching every active cross-filter (None if none is active)."""
+    active = {dim: values for dim, values in selection.items() if values}
+    if not active:
+        return None
+    picked = {}
+    for dim, values in active.items():
+        index = _index(F, key, dim)
+        picked[dim] = (index, [index["lookup"][v] for v in values if v in index["lookup"]])
+
+    def size(item):
+        index, codes = item
+        return sum(index["offsets"][c + 2] - index["offsets"][c + 1] for c in codes)
+
+    # Start from the smallest slice, then narrow it by the other dimensions' codes: O(slice)
+    dims = sorted(picked, key=lambda d: size(picked[d]))
+    index, codes = picked[dims[0]]
+    pos = np.concatenate([index["order"][index["offsets"][c + 1]:index["offsets"][c + 2]] for c in codes]
+                         or [np.array([], dtype=np.int64)])
+    for dim in dims[1:]:
+        index, codes = picked[dim]
+        pos = pos[np.isin(index["codes"][pos], codes)]
+    return np.sort(pos)
+
+
+def apply(F: pd.DataFrame, key, selection: dict):
+    """(slice of F, aggregate cache key for it) for the active cross-filters."""
+    pos = rows(F, key, selection)
+    if pos is None:
+        return F, key
+    xkey = tuple(sorted((dim, tuple(sorted(map(str, v)))) for dim, v in selection.items() if v))
+    return F.iloc[pos], (None if key is None else (*key, ("xf", xkey)))
+
+
+# =================== SELECTION STATE ===================
+def state(page: str) -> dict:
+    return st.session_state.setdefault(f"xf_{page}", {})
+
+
+def _selected(event, dim: str, data: pd.DataFrame = None) -> tuple:
+    try:
+        sel = event.selection
+        points, boxes = list(sel.get("points", [])), list(sel.get("box", []))
+    except Exception:
+        return ()
+    if dim == "nb":                                 # horizontal bar: category on y
+        return tuple(sorted({str(p["y"]) for p in points if "y" in p}))
+    # heatmap: clicked cells, or every cell centre inside a box (category axes use index coords)
+    cells = {(str(p["y"]), str(p["x"])) for p in points if "x" in p and "y" in p}
+    if data is not None:
+        for box in boxes:
+            (x0, x1), (y0, y1) = sorted(box["x"][:2]), sorted(box["y"][:2])
+            cells |= {(str(r), str(c))
+                      for i, r in enumerate(data.index) if y0 <= i <= y1
+                      for j, c in enumerate(data.columns) if x0 <= j <= x1}
+    return tuple(sorted(cells))
+
+
+def track(page: str, chart_key: str, dim: str, event, data: pd.DataFrame = None):
+    """Turn a chart's selection event into the page's cross-filter for `dim`."""
+    new = _selected(event, dim, data)
+    # The chart keeps its last selection in widget state: only act on a change,
+    # otherwise "Clear" would be undone by the stale selection on the next rerun.
+    seen = f"{chart_key}_seen"
+    if new == st.session_state.get(seen, ()):
+        return
+    st.session_state[seen] = new
+    if new:
+        state(page)[dim] = new
+    else:
+        state(page).pop(dim, None)
+    st.rerun()
+
+
+def _describe(dim: str, values) -> str:
+    shown = [" · ".join(v) if isinstance(v, tuple) else v for v in values[:4]]
+    more = f" +{len(values) - 4}" if len(values) > 4 else ""
+    return f"{LABELS[dim]}: {', '.join(shown)}{more}"
+
+
+def bar(page: str, n_slice: int, n_total: int):
+    """Active cross-filters + row counts, with a Clear button."""
+    xf = {d: v for d, v in state(page).items() if v}
+    if not xf:
+        return
+    c1, c2 = st.columns([6, 1])
+    c1.markdown(
+        f"<div class='smallmuted'>🔗 Cross-filter — {' | '.join(_describe(d, v) for d, v in xf.items())}"
+        f" · {n_slice:,} of {n_total:,} appointments</div>",
+        unsafe_allow_html=True,
+    )
+    if c2.button("Clear", key=f"xf_{page}_clear"):
+        st.session_state[f"xf_{page}"] = {}
+        st.rerun()
@@ -0,0 +1,128 @@
+# data.py — shared data pipeline (loader + filter engine)
+# Used by DB.py (and its pages); no page layout in here.
+
+import os
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+import synth
+from disk_cache import CACHE, file_digest
+
+CSV_PATH = os.environ.get("DASHBOARD_CSV", "noshowappointments-kagglev2-may-2016.csv")
+SYNTH_ROWS = synth.parse_rows(os.environ.get("DASHBOARD_SYNTH_ROWS", "110k"))
+
+# Medical-condition flags packed into one uint8 per row (CondMask), so a
+# condition filter is a single bitwise AND instead of one comparison per column
+CONDITIONS = {"Hipertension": 1, "Diabetes": 2, "Handcap": 4, "Alcoholism": 8}
+
+
+# =================== LOAD ===================
+# Without the CSV we fall back to synth.generate(); DASHBOARD_CSV / DASHBOARD_SYNTH_ROWS
+# let benchmarks point at another file or size the synthetic data.
+def source_version(path: str = CSV_PATH) -> str:
+    """Content hash of the dataset we are about to load (keys every disk-cache entry)."""
+    if path and os.path.exists(path):
+        return file_digest(path)
+    return f"synthetic-13-{SYNTH_ROWS}"
+
+
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    # Normalize dtypes & drop tz (prevents tz-aware/naive subtraction issues)
+    df["ScheduledDay"] = pd.to_datetime(df["ScheduledDay"], errors="coerce")
+    df["AppointmentDay"] = pd.to_datetime(df["AppointmentDay"], errors="coerce")
+    for col in ["ScheduledDay", "AppointmentDay"]:
+        try:
+            df[col] = df[col].dt.tz_localize(None)
+        except TypeError:
+            pass
+
+    df["AppointmentDate"] = df["AppointmentDay"].dt.date
+    df["Month"] = df["AppointmentDay"].dt.to_period("M").astype(str)
+    df["Weekday"] = df["AppointmentDay"].dt.day_name()
+    df["Show"] = np.where(df["No-show"].astype(str).str.upper().eq("NO"), 1, 0)
+    df["NoShow"] = 1 - df["Show"]
+    # Dense int32 patient index (0..n_patients-1) for bincount-style cohort math
+    df["PatientCode"] = pd.factorize(df["PatientId"], use_na_sentinel=False)[0].astype(np.int32)
+    cond = np.zeros(len(df), dtype=np.uint8)
+    for col, bit in CONDITIONS.items():
+        cond |= np.where(df[col].to_numpy() > 0, bit, 0).astype(np.uint8)
+    df["CondMask"] = cond
+    return df
+
+
+def _build(version: str) -> pd.DataFrame:
+    if version.startswith("synthetic"):
+        df = synth.generate(SYNTH_ROWS, seed=13)
+    else:
+        df = pd.read_csv(CSV_PATH)
+    return normalize(df)
+
+
+# One shared, read-only frame per process: cache_data would copy it for every caller
+@st.cache_resource
+def load_data():
+    version = source_version()
+    df = CACHE.get_or_compute("dataset", (version,), lambda: _build(version))
+    df.attrs["version"] = version
+    return df
+
+
+def dataset_version(DF: pd.DataFrame) -> str:
+    return DF.attrs.get("version", "unknown")
+
+
+# =================== FILTERS ===================
+def default_filters(DF: pd.DataFrame) -> dict:
+    """Filter ribbon state with nothing selected (full date + age range)."""
+    return {
+        "start": DF["AppointmentDate"].min(),
+        "end": DF["AppointmentDate"].max(),
+        "genders": (),
+        "sms": "All",
+        "nb": (),
+        "age": (int(DF["Age"].min()), int(DF["Age"].max())),
+        "conditions": (),
+        "noshow": "All",
+    }
+
+
+def filter_key(filters: dict) -> tuple:
+    """Hashable, order-independent key for a filter state."""
+    return (
+        str(filters["start"]), str(filters["end"]),
+        tuple(sorted(filters["genders"])),
+        filters["sms"],
+        tuple(sorted(filters["nb"])),
+        tuple(int(a) for a in filters["age"]),
+        tuple(sorted(filters.get("conditions", ()))),
+        filters.get("noshow", "All"),
+    )
+
+
+def condition_mask(cond: np.ndarray, selected) -> np.ndarray:
+    """Rows having any selected condition; "non" = no condition at all, "ALL"/nothing = every row."""
+    selected = set(selected)
+    if not selected or "ALL" in selected:
+        return np.ones(len(cond), dtype=bool)
+    bits = sum(CONDITIONS[c] for c in selected if c in CONDITIONS)
+    mask = (cond & bits) != 0
+    if "non" in selected:
+        mask |= cond == 0
+    return mask
+
+
+def filter_mask(DF: pd.DataFrame, filters: dict) -> pd.Series:
+    mask = (DF["AppointmentDate"] >= filters["start"]) & (DF["AppointmentDate"] <= filters["end"])
+    if filters["genders"]: mask &= DF["Gender"].isin(filters["genders"])
+    if filters["sms"] != "All": mask &= DF["SMS_received"].eq(1 if filters["sms"] == "Yes" else 0)
+    if filters["nb"]: mask &= DF["Neighbourhood"].isin(filters["nb"])
+    mask &= DF["Age"].between(*filters["age"])
+    # Optional keys (Dashboard.py sidebar); DB.py's ribbon leaves them out
+    if filters.get("conditions"): mask &= condition_mask(DF["CondMask"].to_numpy(), filters["conditions"])
+    if filters.get("noshow", "All").upper() != "ALL": mask &= DF["NoShow"].eq(1 if filters["noshow"] == "Yes" else 0)
+    return mask
+
+
+def apply_filters(DF: pd.DataFrame, filters: dict) -> pd.DataFrame:
+    return DF.loc[filter_mask(DF, filters)].copy()
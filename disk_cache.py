@@ -0,0 +1,144 @@
+# disk_cache.py — persistent on-disk cache shared by all worker processes
+#
+# Entries are pickled to <CACHE_DIR>/<namespace>/<digest>.pkl where the digest
+# covers CODE_VERSION + the caller's key (which always starts with the dataset
+# content hash).  Writes go to a temp file in the same directory and are then
+# os.replace()'d into place, so concurrent readers never see a partial file.
+# The directory is kept under MAX_BYTES by evicting least-recently-used files:
+# set() keeps a running size total and only walks the tree when that total
+# crosses the limit (or every RESCAN_EVERY writes, to pick up other workers'
+# files). A single entry bigger than MAX_BYTES is not cached at all.
+
+import os
+import pickle
+import hashlib
+import tempfile
+import threading
+
+# Bump whenever the normalized schema or any aggregate changes shape.
+CODE_VERSION = "3"
+
+CACHE_DIR = os.environ.get(
+    "DASHBOARD_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+)
+MAX_BYTES = int(float(os.environ.get("DASHBOARD_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+RESCAN_EVERY = 256
+
+
+def file_digest(path: str, chunk: int = 1 << 20) -> str:
+    """Content hash of a file (blake2b, streamed in 1 MiB chunks)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class DiskCache:
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = None           # running total of .pkl bytes (None = not scanned yet)
+        self._writes = 0
+
+    def _path(self, namespace: str, key) -> str:
+        digest = hashlib.blake2b(repr((CODE_VERSION, namespace, key)).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.root, namespace, f"{digest}.pkl")
+
+    def get(self, namespace: str, key, default=None):
+        path = self._path(namespace, key)
+        try:
+            with open(path, "rb") as fh:
+                value = pickle.load(fh)
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except Exception:
+            # Truncated / incompatible pickle: treat as a miss and let it be rewritten
+            self.misses += 1
+            return default
+        try:
+            os.utime(path)          # bump mtime so eviction is LRU, not FIFO
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def set(self, namespace: str, key, value):
+        path = self._path(namespace, key)
+        folder = os.path.dirname(path)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                size = os.path.getsize(tmp)
+                if size > self.max_bytes:
+                    os.remove(tmp)  # would only evict everything else, then itself
+                    return
+                try:
+                    replaced = os.path.getsize(path)
+                except OSError:
+                    replaced = 0
+                os.replace(tmp, path)
+            except BaseException:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+        except OSError:
+            return                  # read-only / full disk: cache is best-effort
+        self._added(size - replaced)
+
+    def get_or_compute(self, namespace: str, key, fn):
+        _missing = object()
+        value = self.get(namespace, key, _missing)
+        if value is _missing:
+            value = fn()
+            self.set(namespace, key, value)
+        return value
+
+    def _added(self, delta: int):
+        with self._lock:
+            self._writes += 1
+            if self._size is not None and self._writes % RESCAN_EVERY:
+                self._size += delta
+                if self._size <= self.max_bytes:
+                    return
+        self._evict()
+
+    def _evict(self):
+        """Walk the tree, resync the running total and drop LRU files down to max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for dirpath, _, files in os.walk(self.root):
+                for name in files:
+                    if not name.endswith(".pkl"):
+                        continue
+                    p = os.path.join(dirpath, name)
+                    try:
+                        st_ = os.stat(p)
+                    except OSError:
+                        continue    # removed by another worker meanwhile
+                    entries.append((st_.st_mtime, st_.st_size, p))
+                    total += st_.st_size
+            if total > self.max_bytes:
+                for _, size, p in sorted(entries):
+                    try:
+                        os.remove(p)
+                    except OSError:
+                        pass
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+            self._size = total
+
+
+CACHE = DiskCache()
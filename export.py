@@ -0,0 +1,114 @@
+# export.py — streaming export of the filtered selection (CSV / CSV.gz / Parquet)
+#
+# The Details card hands st.download_button a callable (deferred download):
+# nothing runs until the user clicks, and Streamlit then calls it on a worker
+# thread, off every session's script thread. The callable re-derives the row
+# set from the shared DF + the filter ribbon state (no per-session copy of the
+# selection is kept alive), orders it by an index permutation, and writes
+# CHUNK_ROWS rows at a time into a temporary file on disk, so building the
+# file never holds more than one chunk of rows. Streamlit itself keeps the
+# finished file in memory while it is served (there is no streaming response
+# hook), so the returned bytes are the file size: gzip / Parquet keep it small.
+
+import os
+import gzip
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data import filter_mask
+
+CHUNK_ROWS = int(os.environ.get("DASHBOARD_EXPORT_CHUNK_ROWS", "200000"))
+MAX_CONCURRENT = int(os.environ.get("DASHBOARD_EXPORT_MAX_CONCURRENT", "2"))
+FORMATS = {                     # label -> (file extension, mime type)
+    "CSV": (".csv", "text/csv"),
+    "CSV (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+INTERNAL = ("PatientCode", "CondMask")     # derived helper columns not worth exporting
+
+_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT)     # exports queue instead of piling onto the CPU
+
+
+def columns(DF: pd.DataFrame) -> list:
+    return [c for c in DF.columns if c not in INTERNAL]
+
+
+def row_order(DF: pd.DataFrame, filters: dict, sort_by=None, ascending: bool = True) -> np.ndarray:
+    """Positions of the selected rows in DF, in export order (stable, NaNs last)."""
+    rows = np.flatnonzero(filter_mask(DF, filters).to_numpy())
+    if sort_by:
+        keys = DF[sort_by].take(rows).reset_index(drop=True)
+        rows = rows[keys.sort_values(ascending=ascending, kind="stable").index.to_numpy()]
+    return rows
+
+
+def chunks(DF: pd.DataFrame, rows: np.ndarray, cols: list, chunk_rows: int = CHUNK_ROWS):
+    col_pos = DF.columns.get_indexer(cols)
+    for i in range(0, len(rows), chunk_rows):
+        yield DF.iloc[rows[i:i + chunk_rows], col_pos]
+
+
+# =================== WRITERS ===================
+# Both formats go through Arrow: each chunk is converted once and handed to
+# pyarrow's C++ CSV / Parquet writers (far faster than DataFrame.to_csv and
+# they release the GIL, so concurrent reruns keep moving).
+def _tables(DF, rows, cols):
+    import pyarrow as pa
+    schema = None
+    for chunk in chunks(DF, rows, cols):
+        if schema is None:      # inferred from real values (object columns are null-typed when empty)
+            schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+        yield pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+    if schema is None:          # empty selection: header / schema only
+        yield pa.Table.from_pandas(DF.iloc[:1][cols], preserve_index=False).slice(0, 0)
+
+
+def write_csv(fh, DF, rows, cols, compress: bool = False):
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+    # GzipFile.close() writes the trailer but leaves fh open (unlike arrow's compressed streams)
+    sink = pa.PythonFile(gzip.GzipFile(fileobj=fh, mode="wb", compresslevel=1) if compress else fh, mode="w")
+    writer = None
+    for table in _tables(DF, rows, cols):
+        if writer is None:
+            writer = pcsv.CSVWriter(sink, table.schema)
+        writer.write_table(table)
+    writer.close()
+    if compress:
+        sink.close()
+
+
+def write_parquet(fh, DF, rows, cols):
+    import pyarrow.parquet as pq
+    writer = None
+    for table in _tables(DF, rows, cols):                       # one row group per chunk
+        if writer is None:
+            writer = pq.ParquetWriter(fh, table.schema, compression="zstd")
+        writer.write_table(table)
+    writer.close()
+
+
+def export_file(DF: pd.DataFrame, filters: dict, cols: list, fmt: str = "CSV",
+                sort_by=None, ascending: bool = True):
+    """The selection as file bytes, built chunk by chunk in a temporary file.
+
+    Bytes rather than the file object: Streamlit reads whatever it gets into
+    memory anyway (and only accepts a few IO types), and the temp file is
+    gone as soon as this returns.
+    """
+    with _SLOTS:
+        rows = row_order(DF, filters, sort_by, ascending)
+        with tempfile.TemporaryFile() as fh:
+            if fmt == "Parquet":
+                write_parquet(fh, DF, rows, cols)
+            else:
+                write_csv(fh, DF, rows, cols, compress=fmt == "CSV (gzip)")
+            fh.seek(0)
+            return fh.read()
+
+
+def file_name(filters: dict, fmt: str) -> str:
+    return f"appointments_{filters['start']}_{filters['end']}{FORMATS[fmt][0]}"
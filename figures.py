@@ -0,0 +1,205 @@
+# figures.py — figure skeleton cache: build once per chart/theme, patch data after
+#
+# Building a chart through plotly.express costs ~30 ms of template resolution,
+# layout construction and validation, even when only the numbers changed.
+# get(chart_id, THEME, data, build) runs build(data) the first time, learns
+# which column of `data` feeds each trace array (x / y / z / values / labels /
+# text / customdata), and keeps the serialized figure as a skeleton. Later
+# reruns copy the skeleton and swap in the new arrays: no px, no validation.
+#
+# Anything that shapes the figure beyond those arrays (trace split by a color
+# column, pie label order -> colors/pull) is stored as a guard; when the new
+# data doesn't match it, or a binding can't be inferred unambiguously, the
+# chart is simply rebuilt through px. Callers put data-dependent styling that
+# isn't an array (e.g. spline vs linear) into chart_id.
+
+import base64
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+try:        # plotly >= 6: to_dict() ships numeric arrays as base64 typed arrays
+    from _plotly_utils.utils import plotlyjsShortTypes, to_typed_array_spec
+except ImportError:         # plotly 5: plain lists, patched in as lists too
+    plotlyjsShortTypes, to_typed_array_spec = {}, None
+
+ARRAYS = ("x", "y", "z", "values", "labels", "text", "customdata")
+WIDE = {"z": "__values__", "x": "__columns__", "y": "__index__"}    # px.imshow(DataFrame)
+_MAX = 256
+_DTYPES = {short: np.dtype(name) for name, short in plotlyjsShortTypes.items()}
+
+_SKELETONS: "OrderedDict[tuple, dict]" = OrderedDict()
+_LOCK = threading.Lock()
+STATS = {"hit": 0, "build": 0, "uncached": 0}      # read by profiler.py
+
+
+class Prebuilt(go.Figure):
+    """Render-only Figure around a finished plotly dict.
+
+    st.plotly_chart (and profiler.figure) serialize a Figure via to_dict(),
+    which here is the patched skeleton as-is: no trace/layout validation.
+    """
+
+    def __init__(self, spec: dict):
+        object.__setattr__(self, "_spec", spec)
+
+    def to_dict(self):
+        return self._spec
+
+    def to_plotly_json(self):
+        return self._spec
+
+
+# =================== BINDING ===================
+def _column(data: pd.DataFrame, name: str) -> np.ndarray:
+    if name == "__values__":
+        return data.to_numpy()
+    if name == "__columns__":
+        return data.columns.to_numpy()
+    if name == "__index__":
+        return data.index.to_numpy()
+    return data[name].to_numpy()
+
+
+def _decode(value):
+    """Figure.to_dict() ships numeric arrays as typed-array specs ({dtype, bdata, shape})."""
+    if isinstance(value, dict) and "bdata" in value:
+        arr = np.frombuffer(base64.b64decode(value["bdata"]), dtype=_DTYPES[value["dtype"]])
+        if "shape" in value:
+            arr = arr.reshape([int(n) for n in str(value["shape"]).split(",")])
+        return arr
+    return value
+
+
+def _encode(arr: np.ndarray):
+    if to_typed_array_spec is None:
+        return arr.tolist()
+    return to_typed_array_spec(arr) if arr.dtype.kind in "fiub" else arr
+
+
+def _same(a, b) -> bool:
+    a, b = np.asarray(_decode(a)), np.asarray(b)
+    if a.shape != b.shape:
+        return False
+    if a.dtype.kind in "fiub" and b.dtype.kind in "fiub":
+        return bool(np.array_equal(a.astype("float64"), b.astype("float64"), equal_nan=True))
+    return bool((pd.Series(a.ravel(), dtype=object).astype(str).to_numpy()
+                 == pd.Series(b.ravel(), dtype=object).astype(str).to_numpy()).all())
+
+
+def _bind_trace(trace: dict, part: pd.DataFrame, wide: bool):
+    """attr -> column name (list of names for customdata); None if ambiguous/unknown."""
+    binding = {}
+    for attr in ARRAYS:
+        value = trace.get(attr)
+        if value is None or isinstance(value, (str, int, float)):
+            continue
+        if wide and attr in WIDE:
+            if not _same(value, _column(part, WIDE[attr])):
+                return None
+            binding[attr] = WIDE[attr]
+        elif attr == "customdata":
+            arr = np.asarray(_decode(value))
+            cols = []
+            for j in range(arr.shape[1] if arr.ndim == 2 else 0):
+                match = [c for c in part.columns if _same(arr[:, j], part[c].to_numpy())]
+                if len(match) != 1:
+                    return None
+                cols.append(match[0])
+            binding[attr] = cols
+        else:
+            match = [c for c in part.columns if _same(value, part[c].to_numpy())]
+            # Two columns holding the same values can't be told apart from one build:
+            # don't cache rather than bind (process-wide) to a possibly wrong column.
+            if len(match) != 1:
+                return None
+            binding[attr] = match[0]
+    return binding
+
+
+def _groups(values: pd.Series):
+    """Row codes + group names in order of first appearance (px's trace order for color=)."""
+    codes, uniques = pd.factorize(values, sort=False)
+    return codes, tuple(str(u) for u in uniques)
+
+
+def _learn(spec: dict, data: pd.DataFrame):
+    """Bindings + guard for a freshly built figure dict; None if it can't be patched safely."""
+    traces = spec["data"]
+    wide = len(traces) == 1 and traces[0].get("type") == "heatmap"
+    if len(traces) == 1:
+        binding = _bind_trace(traces[0], data, wide)
+        if binding is None:
+            return None
+        guard = ("labels", tuple(_column(data, binding["labels"]).astype(str))) if "labels" in binding else None
+        return {"split": None, "bindings": [binding], "guard": guard}
+
+    # Several traces: px split the rows by a color column, one trace per value (trace name)
+    names = tuple(str(t.get("name", "")) for t in traces)
+    for col in data.columns:
+        codes, groups = _groups(data[col])
+        if groups != names:
+            continue
+        bindings = [_bind_trace(t, data[codes == i], False) for i, t in enumerate(traces)]
+        if all(b is not None for b in bindings):
+            return {"split": col, "bindings": bindings, "guard": ("split", names)}
+    return None
+
+
+def _patch(entry: dict, data: pd.DataFrame):
+    split = entry["split"]
+    if split is not None:
+        codes, groups = _groups(data[split])
+        if groups != entry["guard"][1]:
+            return None
+        parts = [data[codes == i] for i in range(len(groups))]
+    else:
+        parts = [data]
+        guard = entry["guard"]
+        if guard and tuple(_column(data, entry["bindings"][0]["labels"]).astype(str)) != guard[1]:
+            return None
+
+    skeleton = entry["spec"]
+    traces = []
+    for trace, binding, part in zip(skeleton["data"], entry["bindings"], parts):
+        trace = dict(trace)
+        for attr, col in binding.items():
+            trace[attr] = _encode(np.column_stack([part[c].to_numpy() for c in col])
+                                  if attr == "customdata" else _column(part, col))
+        traces.append(trace)
+    return Prebuilt({**skeleton, "data": traces})
+
+
+# =================== CACHE ===================
+def _theme_key(THEME: dict) -> tuple:
+    return tuple(sorted(THEME.items()))
+
+
+def get(chart_id: str, THEME: dict, data: pd.DataFrame, build):
+    """Figure for `data`: patched from the cached skeleton, or build(data) on a miss."""
+    key = (chart_id, _theme_key(THEME), tuple(map(str, data.columns)))
+    with _LOCK:
+        entry = _SKELETONS.get(key)
+        if entry is not None:
+            _SKELETONS.move_to_end(key)
+    if entry is not None:
+        fig = _patch(entry, data)
+        if fig is not None:
+            STATS["hit"] += 1
+            return fig
+
+    fig = build(data)
+    spec = fig.to_dict()
+    learned = _learn(spec, data) if spec["data"] else None
+    if learned is None:
+        STATS["uncached"] += 1
+        return fig
+    STATS["build"] += 1
+    with _LOCK:
+        _SKELETONS[key] = {**learned, "spec": spec}
+        _SKELETONS.move_to_end(key)
+        while len(_SKELETONS) > _MAX:
+            _SKELETONS.popitem(last=False)
+    return fig
@@ -0,0 +1,47 @@
+# lazy.py — deferred, timed imports for the DB.py cold-start path
+#
+# Heavy modules (plotly.express, the page modules) are only imported when a
+# page needs them. Python keeps each one in sys.modules (and its bytecode in
+# __pycache__), so only the first import per process pays; that first cost is
+# recorded in IMPORT_TIMES and checked against BUDGET_MS.
+
+import os
+import time
+import logging
+import importlib
+
+BUDGET_MS = float(os.environ.get("DASHBOARD_IMPORT_BUDGET_MS", "1500"))
+
+IMPORT_TIMES: dict = {}     # module name -> ms spent on its first import
+_log = logging.getLogger("dashboard.startup")
+_warned = False
+
+
+def load(name: str):
+    """import_module(name), timing the first (cold) import."""
+    t0 = time.perf_counter()
+    mod = importlib.import_module(name)
+    if name not in IMPORT_TIMES:
+        IMPORT_TIMES[name] = (time.perf_counter() - t0) * 1000
+    return mod
+
+
+def record(name: str, ms: float):
+    IMPORT_TIMES.setdefault(name, ms)
+
+
+def total_ms() -> float:
+    return sum(IMPORT_TIMES.values())
+
+
+def report() -> str:
+    """One-line summary; logs a warning (once per process) when over budget."""
+    global _warned
+    total = total_ms()
+    if total > BUDGET_MS and not _warned:
+        _warned = True
+        worst = sorted(IMPORT_TIMES.items(), key=lambda kv: -kv[1])[:3]
+        _log.warning("import time %.0f ms exceeds budget %.0f ms (slowest: %s)",
+                     total, BUDGET_MS, ", ".join(f"{k} {v:.0f} ms" for k, v in worst))
+    flag = "⚠️ " if total > BUDGET_MS else ""
+    return f"{flag}imports {total:.0f} ms / budget {BUDGET_MS:.0f} ms"
@@ -0,0 +1,280 @@
+# loadtest.py — multi-session load test against a local `streamlit run DB.py`
+#
+#   python loadtest.py --sessions 25 --loops 3
+#   python loadtest.py --sessions 50 --url http://localhost:8501   # existing server
+#
+# Starts DB.py on a free local port (unless --url is given) and drives N
+# concurrent websocket sessions through the same protocol the browser uses
+# (BackMsg.rerun_script / ForwardMsg deltas). Each session follows a
+# realistic interaction script: first load, date-range change, page switches
+# through the sidebar nav buttons (goto), SMS filter change, theme toggle.
+# Opening a tab is client-side only in Streamlit (every tab is rendered on
+# each rerun), so tab steps are think time and cost no rerun.
+#
+# Reports p50/p95/p99 rerun latency overall and per step, reruns/s
+# throughput, script errors and server RSS per session.
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+from datetime import date, timedelta
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SCRIPT = [
+    ("load", None),
+    ("date_range", None),
+    ("goto", "Patients"),
+    ("tab", "Demographics"),
+    ("tab", "Outcomes"),
+    ("sms", None),
+    ("goto", "Appointments"),
+    ("tab", "Cohorts"),
+    ("theme", None),
+    ("goto", "Overview"),
+    ("theme", None),
+]
+
+
+# =================== SERVER ===================
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, env: dict) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "streamlit", "run", os.path.join(HERE, "DB.py"),
+           "--server.headless", "true", "--server.port", str(port),
+           "--server.enableXsrfProtection", "false", "--server.enableCORS", "false",
+           "--browser.gatherUsageStats", "false"]
+    proc = subprocess.Popen(cmd, cwd=HERE, env={**os.environ, **env},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.25)
+    proc.kill()
+    raise RuntimeError("streamlit server did not become healthy")
+
+
+def rss_mb(pid: int):
+    """Resident set size of pid (Linux /proc); None elsewhere."""
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+# =================== SESSION ===================
+class Session:
+    def __init__(self, ws_url: str, rng: random.Random):
+        self.ws_url = ws_url
+        self.rng = rng
+        self.ws = None
+        self.query = "page=overview"
+        self.widgets = {}       # label -> (kind, element proto), from the latest run
+        self.values = {}        # widget id -> WidgetState we keep sending
+        self.latencies = []     # (step, seconds)
+        self.errors = 0
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.ws_url, subprotocols=["streamlit"],
+                                           max_size=None, open_timeout=60)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def rerun(self, step: str, triggers=()):
+        msg = BackMsg()
+        cs = msg.rerun_script
+        cs.query_string = self.query
+        cs.widget_states.widgets.extend(list(self.values.values()) + list(triggers))
+
+        self.widgets = {}       # only what this run renders (e.g. the active page has no nav button)
+        t0 = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await self.ws.recv())
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                el = fwd.delta.new_element
+                etype = el.WhichOneof("type")
+                if etype == "exception":
+                    self.errors += 1
+                elif etype in ("button", "date_input", "selectbox"):
+                    proto = getattr(el, etype)
+                    self.widgets[proto.label] = (etype, proto)
+            elif kind == "page_info_changed":
+                self.query = fwd.page_info_changed.query_string
+            elif kind == "script_finished":
+                if fwd.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    self.widgets = {}     # our trigger caused st.rerun(): wait for the follow-up run
+                    continue
+                break
+        self.latencies.append((step, time.perf_counter() - t0))
+
+    def _find(self, kind: str, suffix: str):
+        for label, (k, proto) in self.widgets.items():
+            if k == kind and label.endswith(suffix):
+                return proto
+        return None
+
+    async def step(self, name: str, arg):
+        if name == "load":
+            await self.rerun(name)
+        elif name == "tab":
+            return                                  # client-side only
+        elif name == "date_range":
+            w = self._find("date_input", "Date range")
+            # the widget's default is the full data range (min/max are Streamlit's ±10y)
+            lo, hi = (date.fromisoformat(v.replace("/", "-")) for v in w.default[:2])
+            span = (hi - lo).days
+            start = lo + timedelta(days=self.rng.randint(0, max(0, span // 2)))
+            end = start + timedelta(days=self.rng.randint(30, max(31, span // 2)))
+            ws = WidgetState(id=w.id)
+            ws.string_array_value.data.extend([start.isoformat(), min(end, hi).isoformat()])
+            self.values[w.id] = ws
+            await self.rerun(name)
+        elif name == "sms":
+            w = self._find("selectbox", "SMS")
+            self.values[w.id] = WidgetState(id=w.id, string_value=self.rng.choice(["Yes", "No"]))
+            await self.rerun(name)
+        elif name == "goto":
+            w = self._find("button", arg)
+            if w is None:                           # already on that page (active pill)
+                return
+            await self.rerun(f"goto:{arg.lower()}", [WidgetState(id=w.id, trigger_value=True)])
+        elif name == "theme":
+            w = self._find("button", "Dark") or self._find("button", "Light")
+            await self.rerun(name, [WidgetState(id=w.id, trigger_value=True)])
+
+
+async def run_session(ws_url: str, seed: int, loops: int, think: float, delay: float) -> Session:
+    await asyncio.sleep(delay)
+    s = Session(ws_url, random.Random(seed))
+    await s.connect()
+    try:
+        for _ in range(loops):
+            for name, arg in SCRIPT:
+                await s.step(name, arg)
+                await asyncio.sleep(s.rng.uniform(0.5, 1.5) * think)
+    finally:
+        await s.close()
+    return s
+
+
+# =================== REPORT ===================
+def _pct(values) -> dict:
+    if not values:
+        return {}
+    arr = np.asarray(values) * 1000
+    return {"n": len(arr), "p50_ms": round(float(np.percentile(arr, 50)), 1),
+            "p95_ms": round(float(np.percentile(arr, 95)), 1),
+            "p99_ms": round(float(np.percentile(arr, 99)), 1)}
+
+
+def report(sessions, wall: float, rss_idle, rss_peak, n: int) -> dict:
+    lat = [secs for s in sessions for _, secs in s.latencies]
+    steps = {}
+    for s in sessions:
+        for name, secs in s.latencies:
+            steps.setdefault(name, []).append(secs)
+    out = {
+        "sessions": n, "wall_s": round(wall, 2),
+        "reruns": len(lat), "throughput_rps": round(len(lat) / wall, 2) if wall else 0.0,
+        "errors": sum(s.errors for s in sessions),
+        "latency": _pct(lat),
+        "steps": {k: _pct(v) for k, v in sorted(steps.items())},
+    }
+    if rss_idle is not None and rss_peak is not None:
+        out["server_rss_mb"] = {"idle": round(rss_idle, 1), "peak": round(rss_peak, 1),
+                                "per_session": round((rss_peak - rss_idle) / max(1, n), 2)}
+    return out
+
+
+async def drive(args, ws_url: str, pid):
+    # One warm session first so the idle RSS includes the loaded dataset
+    await run_session(ws_url, seed=0, loops=1, think=0, delay=0)
+    rss_idle = rss_mb(pid) if pid else None
+    rss_peak = [rss_idle]
+
+    async def sample_rss():
+        while True:
+            v = rss_mb(pid) if pid else None
+            if v is not None:
+                rss_peak[0] = max(rss_peak[0] or 0, v)
+            await asyncio.sleep(0.2)
+
+    sampler = asyncio.create_task(sample_rss())
+    t0 = time.perf_counter()
+    sessions = await asyncio.gather(*[
+        run_session(ws_url, seed=i + 1, loops=args.loops, think=args.think,
+                    delay=args.ramp * i / max(1, args.sessions))
+        for i in range(args.sessions)
+    ])
+    wall = time.perf_counter() - t0
+    sampler.cancel()
+    return report(sessions, wall, rss_idle, rss_peak[0], args.sessions)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Multi-session load test for DB.py")
+    ap.add_argument("--sessions", type=int, default=10)
+    ap.add_argument("--loops", type=int, default=2, help="times each session repeats the script")
+    ap.add_argument("--think", type=float, default=1.0, help="mean think time between steps (s)")
+    ap.add_argument("--ramp", type=float, default=5.0, help="spread session starts over this many seconds")
+    ap.add_argument("--url", help="use an already running server instead of starting one")
+    ap.add_argument("--rows", default=None, help="DASHBOARD_SYNTH_ROWS for the spawned server, e.g. 1m")
+    ap.add_argument("--json", help="also write the report to this file")
+    args = ap.parse_args(argv)
+
+    proc, pid = None, None
+    if args.url:
+        base = args.url.rstrip("/")
+    else:
+        port = _free_port()
+        env = {"DASHBOARD_SYNTH_ROWS": args.rows} if args.rows else {}
+        proc = start_server(port, env)
+        pid = proc.pid
+        base = f"http://127.0.0.1:{port}"
+    ws_url = base.replace("http", "ws", 1) + "/_stcore/stream"
+
+    try:
+        result = asyncio.run(drive(args, ws_url, pid))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(result, fh, indent=2)
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# profiler.py — per-rerun hot-path profiler (enable with ?profile=1)
+#
+# DB.py calls begin() at the top of every rerun and render_panel() at the end.
+# In between, sections (card open/close pairs, KPI tiles, the filter mask,
+# each page) are timed, Plotly figures are sized as they'd be serialized, and
+# cache hit/miss counters are diffed. When disabled every hook is a single
+# attribute check, so it can stay wired into the hot paths permanently.
+# Traces are kept per session (downloadable from the panel); they are also
+# appended server-side only when DASHBOARD_PROFILE_LOG names a file.
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+import streamlit as st
+
+TRACE_LOG = os.environ.get("DASHBOARD_PROFILE_LOG")       # unset: no server-side file
+_local = threading.local()      # one script thread per session rerun
+
+
+def _trace():
+    return getattr(_local, "trace", None)
+
+
+def _counters() -> dict:
+    import sys
+    import aggregates
+    from disk_cache import CACHE
+    out = {**{f"agg.{k}": v for k, v in aggregates.STATS.items()},
+           "disk.hit": CACHE.hits, "disk.miss": CACHE.misses}
+    figures = sys.modules.get("figures")        # lazily imported with Plotly
+    if figures is not None:
+        out.update({f"fig.{k}": v for k, v in figures.STATS.items()})
+    return out
+
+
+def begin(enabled: bool, page: str = ""):
+    if not enabled:
+        _local.trace = None
+        return
+    _local.trace = {
+        "ts": time.time(), "page": page, "t0": time.perf_counter(),
+        "sections": [], "figures": [], "stack": [], "counters0": _counters(),
+    }
+
+
+def open_section(name: str):
+    tr = _trace()
+    if tr is not None:
+        tr["stack"].append((name, time.perf_counter()))
+
+
+def close_section():
+    tr = _trace()
+    if tr is not None and tr["stack"]:
+        name, t0 = tr["stack"].pop()
+        tr["sections"].append({"section": name, "depth": len(tr["stack"]),
+                               "ms": round((time.perf_counter() - t0) * 1000, 2)})
+
+
+@contextmanager
+def section(name: str):
+    open_section(name)
+    try:
+        yield
+    finally:
+        close_section()
+
+
+def figure(fig):
+    """Record the serialized size of a figure about to be sent to the browser."""
+    tr = _trace()
+    if tr is None:
+        return
+    owner = tr["stack"][-1][0] if tr["stack"] else "—"
+    tr["figures"].append({"section": owner, "bytes": len(fig.to_json())})
+
+
+def finish() -> dict:
+    tr = _trace()
+    if tr is None:
+        return {}
+    while tr["stack"]:          # unbalanced open (e.g. st.stop mid-card)
+        close_section()
+    now = _counters()
+    record = {
+        "ts": tr["ts"], "page": tr["page"],
+        "total_ms": round((time.perf_counter() - tr["t0"]) * 1000, 2),
+        "sections": tr["sections"], "figures": tr["figures"],
+        # process-wide counters: concurrent sessions' activity shows up here too
+        "cache": {k: now[k] - tr["counters0"].get(k, 0) for k in now},
+    }
+    _local.trace = None
+    return record
+
+
+def export(record: dict, path: str = TRACE_LOG):
+    if not path:
+        return
+    try:
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record, default=str) + "\n")
+    except OSError:
+        pass
+
+
+def render_panel():
+    """Close the trace, append it to TRACE_LOG (if set) and show it in a collapsible panel."""
+    record = finish()
+    if not record:
+        return
+    export(record)
+    history = st.session_state.setdefault("_profile_history", [])
+    history.append(record)
+    del history[:-50]
+
+    with st.expander(f"⏱ Profile — {record['total_ms']:.0f} ms rerun", expanded=False):
+        c1, c2 = st.columns([2, 1])
+        with c1:
+            st.markdown("<div class='section-title'>Sections</div>", unsafe_allow_html=True)
+            st.dataframe(record["sections"], use_container_width=True, hide_index=True)
+        with c2:
+            st.markdown("<div class='section-title'>Cache</div>", unsafe_allow_html=True)
+            st.dataframe([{"counter": k, "Δ": v} for k, v in record["cache"].items()],
+                         use_container_width=True, hide_index=True)
+            kb = sum(f["bytes"] for f in record["figures"]) / 1024
+            st.markdown(f"<div class='section-title'>Figures · {kb:,.1f} KB</div>", unsafe_allow_html=True)
+            st.dataframe(record["figures"], use_container_width=True, hide_index=True)
+        st.download_button(
+            "Download traces (JSON lines)",
+            "\n".join(json.dumps(r, default=str) for r in history),
+            file_name="profile_traces.jsonl",
+            mime="application/x-ndjson",
+        )
@@ -0,0 +1,183 @@
+# risk.py — vectorized no-show risk scoring (NumPy-only, cached per dataset)
+#
+# Model: logistic regression over binned / categorical features, i.e. one
+# coefficient per (feature, bin). Every feature is encoded to small integer
+# codes, so training is backfitting with np.bincount (gradient + Hessian per
+# bin, one Newton step per feature and pass) and scoring is just
+#     logit = bias + sum_f table_f[code_f]
+# — a handful of gathers per row, well under a second for millions of rows.
+# The fitted tables are tiny and cached in memory and on disk, keyed by the
+# dataset version. The Risk page's summaries of the scores are page aggregates
+# (aggregates.RISK), cached per filter key like every other page's.
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from aggregates import AGE_LABELS, _age_bins
+from disk_cache import CACHE
+
+MODEL_VERSION = "1"     # bump disk_cache.CODE_VERSION with it: cached Risk summaries embed the scores
+MAX_TRAIN_ROWS = 1_000_000      # larger datasets are subsampled for fitting
+PASSES = 12
+L2 = 1.0
+
+AGE_EDGES = [5, 12, 18, 25, 35, 45, 55, 65, 75, 85]
+LEAD_EDGES = [1, 2, 4, 8, 15, 30, 60, 90]
+FLAGS = ["Scholarship", "Hipertension", "Diabetes", "Alcoholism", "SMS_received"]
+TOP_COLUMNS = ["AppointmentID", "PatientId", "AppointmentDay", "Neighbourhood", "Age", "SMS_received"]
+FEATURES = ["Age", "LeadTime", "Gender", "Handcap", "Weekday", "Neighbourhood"] + FLAGS
+
+_MODELS = {}
+_LOCK = threading.Lock()
+
+
+# =================== ENCODING ===================
+def lead_days(df: pd.DataFrame) -> np.ndarray:
+    """Days between scheduling and appointment; same-day (negative) -> 0."""
+    lead = (df["AppointmentDay"] - df["ScheduledDay"]).dt.days.to_numpy(dtype="float64", na_value=0)
+    return np.clip(lead, 0, None)
+
+
+def encode(df: pd.DataFrame, neighbourhoods) -> dict:
+    """Feature name -> int codes (0..n_bins-1) for every row of df."""
+    codes = {
+        "Age": np.digitize(df["Age"].to_numpy(dtype="float64"), AGE_EDGES),
+        "LeadTime": np.digitize(lead_days(df), LEAD_EDGES),
+        "Gender": np.where(df["Gender"].eq("F").to_numpy(), 0, 1),
+        "Handcap": np.clip(df["Handcap"].to_numpy(dtype="int64"), 0, 2),
+        "Weekday": df["AppointmentDay"].dt.dayofweek.to_numpy(dtype="int64", na_value=0),
+    }
+    nb = pd.Categorical(df["Neighbourhood"], categories=neighbourhoods).codes.astype(np.int64)
+    codes["Neighbourhood"] = np.where(nb < 0, len(neighbourhoods), nb)     # unseen -> own bin
+    for f in FLAGS:
+        codes[f] = np.clip(df[f].to_numpy(dtype="int64"), 0, 1)
+    return codes
+
+
+def _n_bins(neighbourhoods) -> dict:
+    sizes = {"Age": len(AGE_EDGES) + 1, "LeadTime": len(LEAD_EDGES) + 1, "Gender": 2,
+             "Handcap": 3, "Weekday": 7, "Neighbourhood": len(neighbourhoods) + 1}
+    sizes.update({f: 2 for f in FLAGS})
+    return sizes
+
+
+# =================== TRAIN / SCORE ===================
+def train(DF: pd.DataFrame, seed: int = 0) -> dict:
+    if len(DF) > MAX_TRAIN_ROWS:
+        idx = np.random.default_rng(seed).choice(len(DF), MAX_TRAIN_ROWS, replace=False)
+        DF = DF.iloc[np.sort(idx)]
+    neighbourhoods = sorted(DF["Neighbourhood"].dropna().astype(str).unique())
+    codes = encode(DF, neighbourhoods)
+    y = DF["NoShow"].to_numpy(dtype="float64")
+
+    rate = np.clip(y.mean(), 1e-6, 1 - 1e-6)
+    bias = float(np.log(rate / (1 - rate)))
+    tables = {f: np.zeros(n) for f, n in _n_bins(neighbourhoods).items()}
+    logit = np.full(len(y), bias)
+
+    for _ in range(PASSES):
+        for f in FEATURES:
+            c, t = codes[f], tables[f]
+            p = 1 / (1 + np.exp(-logit))
+            grad = np.bincount(c, weights=p - y, minlength=len(t)) + L2 * t
+            hess = np.bincount(c, weights=p * (1 - p), minlength=len(t)) + L2
+            step = grad / hess
+            t -= step
+            logit -= step[c]
+
+    return {"version": MODEL_VERSION, "bias": bias, "tables": tables,
+            "neighbourhoods": neighbourhoods, "n_train": len(y)}
+
+
+def score(df: pd.DataFrame, model: dict) -> np.ndarray:
+    """No-show probability per row (float32), fully vectorized."""
+    codes = encode(df, model["neighbourhoods"])
+    logit = np.full(len(df), model["bias"], dtype="float64")
+    for f, table in model["tables"].items():
+        logit += table[codes[f]]
+    return (1 / (1 + np.exp(-logit))).astype(np.float32)
+
+
+def get_model(DF: pd.DataFrame = None, version: str = None) -> dict:
+    """Model for a dataset version: memory -> disk -> train (on load_data() if DF is None).
+
+    Pass the version (data.dataset_version of any frame or slice) on hot paths:
+    without it, DF=None means hashing the source file to find the version.
+    """
+    import data
+    if version is None:
+        version = data.dataset_version(DF) if DF is not None else data.source_version()
+    with _LOCK:
+        if version in _MODELS:
+            return _MODELS[version]
+    if DF is None:
+        DF = data.load_data()
+    model = CACHE.get_or_compute("risk-model", (version, MODEL_VERSION), lambda: train(DF))
+    with _LOCK:
+        _MODELS[version] = model
+    return model
+
+
+def auc(y: np.ndarray, s: np.ndarray) -> float:
+    """Rank-based ROC AUC (ties get average rank)."""
+    y = np.asarray(y, dtype=bool)
+    n_pos, n_neg = y.sum(), (~y).sum()
+    if n_pos == 0 or n_neg == 0:
+        return float("nan")
+    ranks = pd.Series(s).rank(method="average").to_numpy()
+    return float((ranks[y].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+# =================== SUMMARIES (Risk page) ===================
+def _high_at(scores: np.ndarray) -> np.ndarray:
+    """high[p] = appointments scoring >= p% (p = 0..100), so any slider threshold is a lookup."""
+    cuts = (np.arange(101) / 100).astype(scores.dtype)
+    return len(scores) - np.searchsorted(np.sort(scores), cuts, side="left")
+
+
+def _top(F: pd.DataFrame, scores: np.ndarray, n: int = 100) -> pd.DataFrame:
+    top = np.argsort(-scores)[:n] if len(scores) <= n else np.argpartition(-scores, n)[:n]
+    top = top[np.argsort(-scores[top])]
+    return F.iloc[top][TOP_COLUMNS].assign(**{"Risk %": np.round(scores[top] * 100, 1)})
+
+
+def summarize(F: pd.DataFrame, model: dict) -> dict:
+    """Everything the Risk page shows for F except the threshold (see high_at)."""
+    scores = score(F, model)
+    y = F["NoShow"].to_numpy()
+    counts, edges = np.histogram(scores, bins=40, range=(0, 1))
+    hist = pd.DataFrame({"Risk": (edges[:-1] + edges[1:]) / 2 * 100, "Appointments": counts})
+
+    deciles = pd.qcut(pd.Series(scores), 10, labels=False, duplicates="drop")
+    calib = (pd.DataFrame({"Decile": deciles.to_numpy() + 1, "Predicted %": scores * 100, "Observed %": y * 100})
+               .groupby("Decile").mean().reset_index())
+
+    # Top cohorts (Neighbourhood x AgeBin) via integer codes + bincount, no string groupby;
+    # age bins are the Patients page's (pd.cut: ages outside AGE_BINS, e.g. 0, belong to none)
+    nb_codes, nb_names = pd.factorize(F["Neighbourhood"], sort=True, use_na_sentinel=False)
+    age_codes = _age_bins(F).cat.codes.to_numpy().astype(np.int64)
+    binned = age_codes >= 0
+    combo = nb_codes[binned].astype(np.int64) * len(AGE_LABELS) + age_codes[binned]
+    size = np.bincount(combo, minlength=len(nb_names) * len(AGE_LABELS))
+    total = np.bincount(combo, weights=scores[binned], minlength=len(size))
+    keep = np.flatnonzero(size >= 20)
+    top = keep[np.argsort(-(total[keep] / size[keep]))[:15]]
+    cohorts = pd.DataFrame({
+        "Cohort": [f"{nb_names[i // len(AGE_LABELS)]} · {AGE_LABELS[i % len(AGE_LABELS)]}" for i in top],
+        "Avg risk %": total[top] / size[top] * 100,
+        "Appointments": size[top],
+    })
+
+    return {
+        "n": len(F),
+        "mean_risk": float(scores.mean() * 100),
+        "observed": float(y.mean() * 100),
+        "high_at": _high_at(scores),
+        "auc": auc(y, scores),
+        "hist": hist,
+        "calibration": calib,
+        "cohorts": cohorts,
+        "top": _top(F, scores),
+    }
@@ -0,0 +1,89 @@
+# risk_page.py
+import streamlit as st
+import plotly.express as px
+import pandas as pd
+
+import aggregates
+import figures
+import risk
+import profiler
+import compat  # noqa: F401  (asyncio/warnings shims)
+from data import dataset_version
+
+
+def _card_open(title: str):
+    profiler.open_section(title)
+    st.markdown(f"<div class='card pad'><div class='section-title'>{title}</div>", unsafe_allow_html=True)
+
+def _card_close():
+    st.markdown("</div>", unsafe_allow_html=True)
+    profiler.close_section()
+
+def _plot(chart_id: str, THEME: dict, data: pd.DataFrame, build):
+    # build(data) runs once per chart/theme; later reruns only patch the data (figures.py)
+    def styled(d):
+        return build(d).update_layout(
+            margin=dict(l=0, r=0, t=0, b=0),
+            paper_bgcolor="rgba(0,0,0,0)",
+            plot_bgcolor="rgba(0,0,0,0)",
+        )
+    fig = figures.get(f"risk.{chart_id}", THEME, data, styled)
+    profiler.figure(fig)
+    st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
+
+def render(F: pd.DataFrame, THEME: dict, key=None):
+    if not len(F):
+        st.info("No data.")
+        return
+
+    # The model is per dataset version: fetched here, on the script thread, so the
+    # summary task below only ever finds it in memory
+    with profiler.section("risk model"):
+        risk.get_model(version=dataset_version(F))
+    # scores + summaries, cached per filter key; the threshold is only a lookup
+    with profiler.section("risk scoring"):
+        R = aggregates.compute("risk", F, key)["summary"]
+
+    pct = st.slider("High-risk threshold (%)", 5, 80, 30, step=5)
+    threshold = pct / 100
+
+    # ================= KPIs =================
+    st.markdown("<div class='kpi-row'>", unsafe_allow_html=True)
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        st.markdown(f"<div class='card pad kpi'><div><div class='num'>{R['mean_risk']:.1f}%</div><div class='lbl'>Avg predicted no-show</div></div></div>", unsafe_allow_html=True)
+    with c2:
+        st.markdown(f"<div class='card pad kpi'><div><div class='num'>{R['observed']:.1f}%</div><div class='lbl'>Observed no-show</div></div></div>", unsafe_allow_html=True)
+    with c3:
+        st.markdown(f"<div class='card pad kpi'><div><div class='num'>{R['high_at'][pct]:,}</div><div class='lbl'>High-risk appointments</div></div></div>", unsafe_allow_html=True)
+    with c4:
+        st.markdown(f"<div class='card pad kpi'><div><div class='num'>{R['auc']:.2f}</div><div class='lbl'>AUC (selection)</div></div></div>", unsafe_allow_html=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    l, r = st.columns([2, 1])
+    with l:
+        _card_open("Risk score distribution")
+        # the threshold line is layout, not data: one skeleton per threshold
+        _plot(f"hist@{threshold:.2f}", THEME, R["hist"], lambda d: px.bar(
+            d, x="Risk", y="Appointments", labels={"Risk": "Predicted no-show %"},
+            color_discrete_sequence=[THEME["primary"]],
+        ).update_layout(bargap=0).add_vline(x=threshold * 100, line_dash="dash", line_color=THEME["danger"]))
+        _card_close()
+    with r:
+        _card_open("Calibration (by decile)")
+        cal = R["calibration"].melt(id_vars="Decile", var_name="Series", value_name="No-Show %")
+        _plot("calibration", THEME, cal, lambda d: px.line(
+            d, x="Decile", y="No-Show %", color="Series", markers=True,
+            color_discrete_sequence=[THEME["primary"], THEME["warn"]]))
+        _card_close()
+
+    _card_open("Top-risk cohorts (neighbourhood × age bin)")
+    _plot("cohorts", THEME, R["cohorts"], lambda d: px.bar(
+        d, x="Avg risk %", y="Cohort", orientation="h",
+        hover_data=["Appointments"], color_discrete_sequence=[THEME["warn"]],
+    ).update_layout(yaxis=dict(categoryorder="total ascending")))
+    _card_close()
+
+    _card_open("Highest-risk appointments")
+    st.dataframe(R["top"], use_container_width=True, hide_index=True)
+    _card_close()
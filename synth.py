@@ -0,0 +1,91 @@
+# synth.py — scalable synthetic appointments (same schema as the Kaggle CSV)
+#
+# Used as the data fallback when the CSV is missing and by benchmark.py.
+# Distributions are shaped after the real dataset: repeat patients (heavy
+# tail of visits per patient), skewed neighbourhood sizes, a same-day spike
+# plus long tail of lead times, weekday-only appointments, and a no-show
+# probability that rises with lead time and falls with age / SMS reminders.
+# Columns use compact dtypes (categoricals, int8) so 50M rows fit in memory.
+
+import numpy as np
+import pandas as pd
+
+NEIGHBOURHOODS = [
+    "Jardim Camburi", "Maria Ortiz", "Resistencia", "Jardim da Penha", "Itarare",
+    "Centro", "Tabuazeiro", "Santa Martha", "Jesus de Nazareth", "Bonfim",
+    "Santo Antonio", "Santo Andre", "Caratoira", "Jabour", "Sao Pedro",
+    "Nova Palestina", "Da Penha", "Andorinhas", "Gurigica", "Sao Cristovao",
+    "Bela Vista", "Redencao", "Grande Vitoria", "Romao", "Sao Jose",
+    "Consolacao", "Cruzamento", "Maruipe", "Forte Sao Joao", "Praia do Suá",
+    "Ilha do Principe", "Conquista", "Joana D'arc", "Inhanguetá", "Fonte Grande",
+    "Ilha de Santa Maria", "Santa Tereza", "Sao Benedito", "Piedade", "Mata da Praia",
+]
+
+START = pd.Timestamp("2015-01-05")      # a Monday
+
+
+def generate(n: int, seed: int = 13, years: float = 3.0) -> pd.DataFrame:
+    """n appointment rows spread over `years` of weekday history."""
+    rng = np.random.default_rng(seed)
+
+    # --- patients: Zipf-ish visit counts -> ~n/1.6 distinct patients
+    n_patients = max(1, int(n / 1.6))
+    weights = 1.0 / np.arange(1, n_patients + 1) ** 0.35
+    pid_idx = rng.choice(n_patients, size=n, p=weights / weights.sum())
+    # unique, Kaggle-looking 14-digit ids without materializing a huge id space
+    patient_ids = 10**13 + np.arange(n_patients, dtype=np.int64) * 7919 + rng.integers(0, 7919, n_patients)
+    p_age = np.clip(rng.gamma(2.2, 17.0, n_patients), 0, 115).astype(np.int16)
+    p_female = rng.random(n_patients) < 0.65
+    nb_w = 1.0 / np.arange(1, len(NEIGHBOURHOODS) + 1) ** 0.9
+    p_nb = rng.choice(len(NEIGHBOURHOODS), n_patients, p=nb_w / nb_w.sum())
+    p_schol = rng.random(n_patients) < 0.10
+    p_hip = rng.random(n_patients) < np.clip(p_age / 160, 0.02, 0.6)
+    p_dia = rng.random(n_patients) < np.clip(p_age / 420, 0.01, 0.25)
+    p_alc = rng.random(n_patients) < 0.03
+    p_hand = rng.choice(np.array([0, 1, 2], dtype=np.int8), n_patients, p=[0.978, 0.02, 0.002])
+
+    # --- appointment day: uniform over weekdays in the window
+    n_weeks = max(1, int(years * 52))
+    week = rng.integers(0, n_weeks, n)
+    dow = rng.choice(6, n, p=[0.21, 0.23, 0.23, 0.17, 0.15, 0.01])     # Mon..Sat
+    appt_day = START + pd.to_timedelta(week * 7 + dow, unit="D")
+
+    # --- lead time: 35% same day, the rest ~ lognormal (median ~9 days)
+    same_day = rng.random(n) < 0.35
+    lead = np.where(same_day, 0, np.clip(rng.lognormal(2.2, 0.9, n), 1, 180)).astype(np.int64)
+    sched_secs = rng.integers(7 * 3600, 18 * 3600, n)
+    # As in the CSV, AppointmentDay is midnight while ScheduledDay carries a time of
+    # day, so same-day bookings come out at -1 days and are dropped by lead-time charts
+    scheduled = appt_day - pd.to_timedelta(lead, unit="D") + pd.to_timedelta(sched_secs, unit="s")
+
+    age = p_age[pid_idx]
+    sms = (lead >= 3) & (rng.random(n) < 0.55)
+
+    # --- no-show probability (logistic in the usual drivers)
+    z = (-1.9 + 0.35 * np.log1p(lead) - 0.008 * (age - 38) - 0.25 * sms
+         + 0.2 * p_schol[pid_idx] + 0.15 * p_alc[pid_idx] - 0.1 * p_hip[pid_idx])
+    no_show = rng.random(n) < 1 / (1 + np.exp(-z))
+
+    return pd.DataFrame({
+        "PatientId": patient_ids[pid_idx].astype("float64"),
+        "AppointmentID": np.arange(5_000_000, 5_000_000 + n, dtype=np.int64),
+        "Gender": pd.Categorical.from_codes(np.where(p_female[pid_idx], 0, 1), ["F", "M"]),
+        "ScheduledDay": scheduled,
+        "AppointmentDay": appt_day,
+        "Age": age,
+        "Neighbourhood": pd.Categorical.from_codes(p_nb[pid_idx], NEIGHBOURHOODS),
+        "Scholarship": p_schol[pid_idx].astype(np.int8),
+        "Hipertension": p_hip[pid_idx].astype(np.int8),
+        "Diabetes": p_dia[pid_idx].astype(np.int8),
+        "Alcoholism": p_alc[pid_idx].astype(np.int8),
+        "Handcap": p_hand[pid_idx],
+        "SMS_received": sms.astype(np.int8),
+        "No-show": pd.Categorical.from_codes(no_show.astype(np.int8), ["No", "Yes"]),
+    })
+
+
+def parse_rows(text: str) -> int:
+    """'10k' / '1m' / '50M' / '1400' -> int."""
+    text = str(text).strip().lower().replace("_", "")
+    mult = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if mult > 1 else text) * mult)
@@ -0,0 +1,20 @@
+# Shared fixtures: the repo's modules are flat top-level files
+import os
+import sys
+import tempfile
+
+import pytest
+
+# before any repo import: keep the on-disk cache out of the working tree
+os.environ.setdefault("DASHBOARD_CACHE_DIR", tempfile.mkdtemp(prefix="dashboard-test-cache-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def DF():
+    """Small normalized synthetic dataset (same pipeline as load_data)."""
+    import data
+    import synth
+    df = data.normalize(synth.generate(3000, seed=7, years=1.0))
+    df.attrs["version"] = "test-3000"
+    return df
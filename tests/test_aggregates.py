@@ -0,0 +1,147 @@
+# aggregates.py execution layer: concurrent tasks, in-flight joins, background promotion
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+from data import apply_filters, dataset_version, default_filters, filter_key
+
+N_TASKS = 6
+
+
+@pytest.fixture
+def page(monkeypatch):
+    """A fake page whose tasks block until `gate` is set; pools smaller than the task count."""
+    gate = threading.Event()
+    started = []
+
+    def task(name):
+        def run(F):
+            started.append(name)
+            if not gate.wait(10):
+                raise TimeoutError(name)
+            if name == "boom" and F.get("fail"):
+                raise ValueError(name)
+            return f"{name}:{len(F)}"
+        return run
+
+    tasks = {f"t{i}": task(f"t{i}") for i in range(N_TASKS)}
+    tasks["boom"] = task("boom")
+    monkeypatch.setitem(aggregates.PAGES, "fake", (tasks, {}))
+    pool = ThreadPoolExecutor(max_workers=2)
+    bg_pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(aggregates, "_POOL", pool)
+    monkeypatch.setattr(aggregates, "_BG_POOL", bg_pool)
+    yield gate, started, list(tasks)
+    gate.set()
+    pool.shutdown(wait=True)
+    bg_pool.shutdown(wait=True)
+
+
+def _read_in_thread(A, names):
+    out = {}
+
+    def read():
+        try:
+            out["value"] = {n: A[n] for n in names}
+        except BaseException as e:       # noqa: BLE001 (reported to the test)
+            out["error"] = e
+
+    t = threading.Thread(target=read)
+    t.start()
+    return t, out
+
+
+def _settle(mem_key):
+    """Wait for the store callback (it runs just after the last task's result is set)."""
+    for _ in range(500):
+        if mem_key not in aggregates._INFLIGHT:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"{mem_key} still in flight")
+
+
+def test_concurrent_join_shares_the_computation(page):
+    gate, _, names = page
+    F, key = {"rows": 1}, ("v", "join")
+    A = aggregates.compute("fake", F, key)
+    reader, out = _read_in_thread(A, names[::-1])        # blocks on a task still queued in _POOL
+    assert aggregates.compute("fake", F, key) is A        # second session joins, cancels nothing
+    gate.set()
+    reader.join(10)
+    assert "error" not in out, out.get("error")
+    assert out["value"] == {n: f"{n}:1" for n in names}
+    _settle(("fake", key))
+    assert aggregates._MEM[("fake", key)] == out["value"]
+
+
+def test_interactive_join_promotes_background_tasks(page):
+    gate, started, names = page
+    F, key = {"rows": 1}, ("v", "promote")
+    A = aggregates.compute("fake", F, key, background=True)
+    warm, out = _read_in_thread(A, names)                  # warm-up thread waiting on everything
+    B = aggregates.compute("fake", F, key)
+    assert B is A
+    assert len(A._background) <= 1                        # at most the one already running on _BG_POOL
+    gate.set()
+    warm.join(10)
+    assert "error" not in out, out.get("error")
+    assert out["value"] == {n: f"{n}:1" for n in names}
+    assert sorted(started) == sorted(names)               # every task ran exactly once
+    _settle(("fake", key))
+    assert aggregates.compute("fake", F, key) == out["value"]     # now a memory hit
+
+
+def test_failure_clears_the_in_flight_entry(page):
+    gate, _, _ = page
+    F, key = {"rows": 1, "fail": True}, ("v", "fail")
+    A = aggregates.compute("fake", F, key)
+    gate.set()
+    with pytest.raises(ValueError):
+        A["boom"]
+    _settle(("fake", key))
+    assert ("fake", key) not in aggregates._MEM
+    assert aggregates.compute("fake", F, key) is not A    # retried, not joined to the failure
+
+
+def _equal(a, b) -> bool:
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_equal(a[k], b[k]) for k in a)
+    if isinstance(a, (pd.DataFrame, pd.Series)):
+        return a.equals(b)
+    if isinstance(a, np.ndarray):
+        return np.array_equal(a, b, equal_nan=a.dtype.kind == "f")
+    return a == b or (a != a and b != b)      # NaN == NaN
+
+
+@pytest.mark.parametrize("name", sorted(aggregates.PAGES))
+def test_concurrent_tasks_match_serial_evaluation(DF, name):
+    F = apply_filters(DF, {**default_filters(DF), "sms": "No"})
+    tasks, _ = aggregates.PAGES[name]
+    serial = {task: fn(F) for task, fn in tasks.items()}
+    A = aggregates.compute(name, F)                        # no key: straight to the pool
+    assert set(A) == set(tasks)
+    for task in reversed(list(tasks)):                     # any read order
+        assert _equal(A[task], serial[task]), task
+
+
+def test_keyed_results_come_back_from_memory_then_disk(DF):
+    filters = {**default_filters(DF), "genders": ("F",)}
+    F, key = apply_filters(DF, filters), (dataset_version(DF), filter_key(filters))
+    first = dict(aggregates.compute("overview", F, key))
+    _settle(("overview", key))
+    hit = aggregates.compute("overview", F, key)
+    assert isinstance(hit, dict) and hit.keys() == first.keys()
+    aggregates._MEM.pop(("overview", key))
+    disk = aggregates.compute("overview", F, key)
+    assert isinstance(disk, dict)
+    assert all(_equal(disk[k], first[k]) for k in first)
+
+
+def test_empty_selection_returns_the_page_defaults(DF):
+    F = DF.iloc[:0]
+    for name, (_, empty) in aggregates.PAGES.items():
+        assert aggregates.compute(name, F, ("v", name)) is empty
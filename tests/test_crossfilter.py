@@ -0,0 +1,64 @@
+# crossfilter.py: inverted-index row selection must match a plain boolean mask
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+import crossfilter
+from data import apply_filters, default_filters
+
+
+@pytest.fixture(scope="module")
+def F(DF):
+    # a filtered slice: non-contiguous index, positions must be positional
+    return apply_filters(DF, {**default_filters(DF), "sms": "No"})
+
+
+def _mask(F: pd.DataFrame, selection: dict) -> np.ndarray:
+    mask = np.ones(len(F), dtype=bool)
+    if selection.get("nb"):
+        mask &= F["Neighbourhood"].isin(selection["nb"]).to_numpy()
+    if selection.get("cell"):
+        cells = pd.Series(list(zip(aggregates._age_bins(F).astype(str), F["Weekday"])), index=F.index)
+        mask &= cells.isin(set(selection["cell"])).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def _selections(F):
+    nbs = F["Neighbourhood"].value_counts().index
+    return [
+        {"nb": tuple(nbs[:1])},
+        {"nb": tuple(nbs[:5])},
+        {"cell": (("18-35", "Monday"),)},
+        {"cell": (("Child", "Tuesday"), ("65+", "Friday"), ("Teen", "Sunday"))},
+        {"nb": tuple(nbs[:8]), "cell": (("36-50", "Wednesday"), ("51-65", "Thursday"))},
+        {"nb": ("no such neighbourhood",)},
+        {"nb": tuple(nbs[:2]), "cell": ()},                  # empty dimension = inactive
+    ]
+
+
+@pytest.mark.parametrize("i", range(7))
+@pytest.mark.parametrize("key", [None, ("v", "xf-test")])
+def test_rows_match_boolean_mask(F, i, key):
+    selection = _selections(F)[i]
+    np.testing.assert_array_equal(crossfilter.rows(F, key, selection), _mask(F, selection))
+
+
+def test_no_active_selection(F):
+    assert crossfilter.rows(F, None, {}) is None
+    assert crossfilter.rows(F, None, {"nb": (), "cell": ()}) is None
+    assert crossfilter.apply(F, ("v", "k"), {"nb": ()}) == (F, ("v", "k"))
+
+
+def test_ages_outside_the_bins_are_never_selected(F):
+    G = F.assign(Age=0)
+    assert len(crossfilter.rows(G, None, {"cell": tuple((a, w) for a in aggregates.AGE_LABELS
+                                                        for w in aggregates.WEEKDAYS)})) == 0
+
+
+def test_apply_keys_the_slice_by_selection(F):
+    nb = tuple(F["Neighbourhood"].value_counts().index[:2])
+    Fx, kx = crossfilter.apply(F, ("v", "k"), {"nb": nb[::-1]})
+    assert len(Fx) == int(F["Neighbourhood"].isin(nb).sum())
+    assert kx == ("v", "k", ("xf", (("nb", tuple(sorted(nb))),)))      # order-independent
+    assert crossfilter.apply(F, None, {"nb": nb})[1] is None
@@ -0,0 +1,39 @@
+# disk_cache.py: bounded size without walking the tree on every write
+import os
+
+import disk_cache
+from disk_cache import DiskCache
+
+
+def _pkl_bytes(root) -> int:
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(root) for f in fs if f.endswith(".pkl"))
+
+
+def test_writes_under_the_limit_do_not_walk_the_tree(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_bytes=1 << 20)
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(disk_cache.os, "walk", lambda *a, **k: walks.append(a) or real_walk(*a, **k))
+    for i in range(50):
+        cache.set("ns", ("k", i), b"x" * 1000)
+    assert len(walks) == 1                          # the first write scans once to seed the total
+    assert cache.get("ns", ("k", 49)) == b"x" * 1000
+
+
+def test_eviction_keeps_the_cache_under_max_bytes(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=20_000)
+    for i in range(60):
+        cache.set("ns", ("k", i), b"x" * 1000)
+        assert _pkl_bytes(tmp_path) <= 20_000
+    assert cache.get("ns", ("k", 59)) is not None   # newest kept, oldest evicted
+    assert cache.get("ns", ("k", 0)) is None
+
+
+def test_oversized_entry_is_skipped(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=20_000)
+    for i in range(5):
+        cache.set("ns", ("small", i), b"x" * 1000)
+    cache.set("ns", "huge", b"x" * 50_000)
+    assert cache.get("ns", "huge") is None
+    assert all(cache.get("ns", ("small", i)) is not None for i in range(5))
+    assert not [f for _, _, fs in os.walk(tmp_path) for f in fs if f.endswith(".tmp")]
@@ -0,0 +1,54 @@
+# export.py: deferred download output, sort order, empty selection
+import gzip
+import io
+
+import pandas as pd
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+import export
+from data import default_filters, filter_mask
+
+COLS = ["AppointmentID", "PatientId", "Age", "Neighbourhood", "No-show"]
+
+
+def _download(DF, filters, fmt, sort_by=None, ascending=True) -> pd.DataFrame:
+    """Run export_file the way st.download_button's deferred callable does, and parse the result."""
+    data = export.export_file(DF, filters, COLS, fmt, sort_by, ascending)
+    raw, _ = convert_data_to_bytes_and_infer_mime(data, unsupported_error=TypeError(type(data)))
+    if fmt == "Parquet":
+        return pd.read_parquet(io.BytesIO(raw))
+    if fmt == "CSV (gzip)":
+        raw = gzip.decompress(raw)
+    return pd.read_csv(io.BytesIO(raw))
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(export.chunks, "__defaults__", (700,))     # several chunks per export
+
+
+@pytest.mark.parametrize("fmt", list(export.FORMATS))
+def test_download_is_accepted_by_streamlit(DF, fmt):
+    filters = {**default_filters(DF), "sms": "Yes"}
+    out = _download(DF, filters, fmt)
+    expected = DF.loc[filter_mask(DF, filters), COLS].reset_index(drop=True)
+    assert list(out.columns) == COLS
+    assert out["AppointmentID"].tolist() == expected["AppointmentID"].tolist()
+
+
+@pytest.mark.parametrize("ascending", [True, False])
+def test_sort_is_stable(DF, ascending):
+    filters = default_filters(DF)
+    out = _download(DF, filters, "CSV", sort_by="Age", ascending=ascending)
+    expected = (DF.loc[filter_mask(DF, filters), COLS]
+                  .sort_values("Age", ascending=ascending, kind="stable"))
+    assert out["AppointmentID"].tolist() == expected["AppointmentID"].tolist()
+
+
+@pytest.mark.parametrize("fmt", list(export.FORMATS))
+def test_empty_selection_keeps_the_header(DF, fmt):
+    filters = {**default_filters(DF), "age": (500, 600)}
+    out = _download(DF, filters, fmt)
+    assert len(out) == 0
+    assert list(out.columns) == COLS
@@ -0,0 +1,42 @@
+# Regression tests for the figure skeleton cache (figures.py)
+import os
+import sys
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import figures  # noqa: E402
+
+
+def _json(fig) -> str:
+    return pio.to_json(fig.to_dict(), validate=False)
+
+
+def test_ambiguous_first_build_is_not_cached():
+    build = lambda d: px.bar(d, x="Visits", y="Patients")
+    # Visits == Patients on the first build: y could be bound to either column
+    figures.get("test.ambiguous", {}, pd.DataFrame({"Visits": [1, 2, 3], "Patients": [1, 2, 3]}), build)
+    data = pd.DataFrame({"Visits": [1, 2, 3], "Patients": [50, 20, 3]})
+    assert _json(figures.get("test.ambiguous", {}, data, build)) == _json(build(data))
+
+
+def test_patch_matches_fresh_build():
+    build = lambda d: px.bar(d, x="Weekday", y="No-Show %", text="No-Show %")
+    figures.get("test.patch", {}, pd.DataFrame({"Weekday": ["Mon", "Tue"], "No-Show %": [10.0, 20.0]}), build)
+    data = pd.DataFrame({"Weekday": ["Mon", "Tue", "Wed"], "No-Show %": [12.5, 7.0, 30.0]})
+    fig = figures.get("test.patch", {}, data, build)
+    assert isinstance(fig, figures.Prebuilt)
+    assert _json(fig) == _json(build(data))
+
+
+def test_patch_without_typed_arrays(monkeypatch):
+    # plotly 5 has no typed-array helpers: arrays are patched in as plain lists
+    monkeypatch.setattr(figures, "to_typed_array_spec", None)
+    build = lambda d: px.bar(d, x="Weekday", y="Count")
+    figures.get("test.plain", {}, pd.DataFrame({"Weekday": ["Mon", "Tue"], "Count": [1, 2]}), build)
+    fig = figures.get("test.plain", {}, pd.DataFrame({"Weekday": ["Mon", "Tue"], "Count": [5, 7]}), build)
+    assert isinstance(fig, figures.Prebuilt)
+    assert fig.to_dict()["data"][0]["y"] == [5, 7]
+    assert fig.to_dict()["data"][0]["x"] == ["Mon", "Tue"]
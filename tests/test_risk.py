@@ -0,0 +1,26 @@
+# risk.py: the Risk page's summary task must not touch the source file
+import aggregates
+import data
+import risk
+from data import default_filters, apply_filters
+
+
+def test_summary_task_uses_the_slice_version(DF, monkeypatch):
+    risk.get_model(DF)                                    # what risk_page / warm-up do first
+
+    def no_source(*a, **k):
+        raise AssertionError("hashed the source file on the hot path")
+
+    monkeypatch.setattr(data, "source_version", no_source)
+    monkeypatch.setattr(data, "load_data", no_source)
+    F = apply_filters(DF, {**default_filters(DF), "sms": "Yes"})
+    R = aggregates._risk_summary(F)
+    assert R["n"] == len(F)
+    assert R["high_at"][0] == len(F)
+
+
+def test_cohorts_leave_out_ages_outside_the_bins(DF):
+    F = DF.assign(Age=0)                  # pd.cut(AGE_BINS) puts age 0 in no bin (Patients page)
+    R = risk.summarize(F, risk.get_model(DF))
+    assert R["n"] == len(F)
+    assert R["cohorts"].empty
@@ -0,0 +1,67 @@
+# timeseries.py: downsampling and zoomed detail counts, edge cases
+import numpy as np
+import pandas as pd
+import pytest
+
+import timeseries
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 10, 57])
+def test_lttb_indices_for_every_output_size(n):
+    x = np.arange(n, dtype="float64")
+    y = np.random.default_rng(n).normal(size=n)
+    for n_out in range(0, n + 3):
+        idx = timeseries.lttb(x, y, n_out)
+        assert len(idx) == (n if n_out >= n or n_out < 3 else n_out)
+        assert np.all(np.diff(idx) > 0)                     # strictly increasing, no duplicates
+        if n:
+            assert idx[0] == 0 and idx[-1] == n - 1         # endpoints always kept
+
+
+def test_lttb_n_out_near_n_keeps_a_spike():
+    y = np.zeros(100)
+    y[37] = 50.0
+    for n_out in (98, 99):
+        assert 37 in timeseries.lttb(np.arange(100.0), y, n_out)
+
+
+@pytest.mark.parametrize("n", [0, 1, 5, 64])
+def test_minmax_keeps_extremes_within_budget(n):
+    y = np.random.default_rng(n).normal(size=n)
+    for n_out in range(0, n + 3):
+        idx = timeseries.minmax(y, n_out)
+        assert np.all(np.diff(idx) > 0)
+        if n_out < n and n_out >= 4:
+            assert len(idx) <= n_out
+        if n:
+            assert y[idx].max() == y.max() and y[idx].min() == y.min()
+
+
+def test_downsample_caps_rows_and_passes_small_frames_through():
+    df = pd.DataFrame({"Time": pd.date_range("2016-01-01", periods=500, freq="h"),
+                       "Count": np.arange(500) % 7})
+    assert timeseries.downsample(df, "Time", "Count", 500) is df
+    for method in ("lttb", "minmax"):
+        out = timeseries.downsample(df, "Time", "Count", 100, method)
+        assert len(out) <= 100 and out["Time"].is_monotonic_increasing
+
+
+def test_counts_by_time_empty_window():
+    ts = pd.Series(pd.to_datetime(["2016-05-10 09:00"]))
+    out = timeseries.counts_by_time(ts, pd.Timestamp("2016-05-01"), pd.Timestamp("2016-05-02"), "Appointments")
+    assert list(out.columns) == ["Time", "Appointments"]
+    assert len(out) == 25 and out["Appointments"].eq(0).all()        # hourly, both ends included
+
+
+def test_counts_by_time_fills_gaps_and_includes_the_end():
+    ts = pd.Series(pd.to_datetime(["2016-05-01 01:30", "2016-05-01 01:45", "2016-05-01 05:00", "2016-05-01 08:00"]))
+    out = timeseries.counts_by_time(ts, pd.Timestamp("2016-05-01 00:30"), pd.Timestamp("2016-05-01 05:00"), "n")
+    assert out["Time"].iloc[0] == pd.Timestamp("2016-05-01 00:00")          # window start floored
+    assert out.set_index("Time")["n"].to_dict() == {
+        pd.Timestamp(f"2016-05-01 0{h}:00"): c for h, c in enumerate([0, 2, 0, 0, 0, 1])}
+
+
+def test_counts_by_time_daily_for_long_windows():
+    ts = pd.Series(pd.to_datetime(["2016-05-01 10:00", "2016-05-09 23:00"]))
+    out = timeseries.counts_by_time(ts, pd.Timestamp("2016-05-01"), pd.Timestamp("2016-05-10"), "n")
+    assert len(out) == 10 and out["n"].sum() == 2 and out["n"].iloc[4] == 0
@@ -0,0 +1,158 @@
+# timeseries.py — bounded-size trend charts (downsampling + zoom re-fetch)
+#
+# Every trend chart goes through render_trend(): the series is capped to
+# roughly one point per horizontal pixel (LTTB by default, min/max buckets
+# for spiky series) so payload and browser spline work stay bounded no
+# matter how much history is loaded. Box-selecting a range on the chart
+# stores it as a zoom window; the next rerun asks the page for finer-grained
+# data inside that window only and downsamples that instead.
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import lazy
+import profiler
+
+
+# =================== DOWNSAMPLING ===================
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of the n_out points to keep."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # Bucket boundaries over the interior points (first/last are always kept)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the *next* bucket is the third triangle vertex
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        ax, ay = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        px_, py_ = x[prev], y[prev]
+        area = np.abs((px_ - ax) * (y[lo:hi] - py_) - (px_ - x[lo:hi]) * (ay - py_))
+        prev = lo + int(area.argmax())
+        keep[i + 1] = prev
+    return keep
+
+
+def minmax(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Min/max per bucket (n_out // 2 buckets): keeps every spike visible."""
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(np.int64)
+    keep = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi <= lo:
+            continue
+        seg = y[lo:hi]
+        keep.extend(sorted({lo + int(seg.argmin()), lo + int(seg.argmax())}))
+    return np.asarray(keep, dtype=np.int64)
+
+
+def downsample(df: pd.DataFrame, x: str, y: str, max_points: int, method: str = "lttb") -> pd.DataFrame:
+    """Cap df (sorted by x) to at most max_points rows."""
+    if len(df) <= max_points:
+        return df
+    if method == "minmax":
+        idx = minmax(df[y].to_numpy(), max_points)
+    else:
+        xs = pd.to_datetime(df[x]).to_numpy().astype("int64") if not np.issubdtype(df[x].dtype, np.number) else df[x].to_numpy()
+        idx = lttb(xs, df[y].to_numpy(), max_points)
+    return df.iloc[idx]
+
+
+def points_for_width(width_px: int, per_px: float = 1.0) -> int:
+    return max(16, int(width_px * per_px))
+
+
+def month_to_time(df: pd.DataFrame, col: str = "Month") -> pd.DataFrame:
+    """'YYYY-MM' period strings -> month-start timestamps (a real, zoomable time axis)."""
+    out = df.copy()
+    out[col] = pd.PeriodIndex(out[col], freq="M").to_timestamp()
+    return out
+
+
+def detail_freq(start: pd.Timestamp, end: pd.Timestamp) -> str:
+    """Granularity for a zoom window: hourly for a few days, daily otherwise."""
+    return "h" if (end - start) <= pd.Timedelta(days=3) else "D"
+
+
+def counts_by_time(ts: pd.Series, start, end, label: str) -> pd.DataFrame:
+    """Event counts of `ts` inside [start, end] at detail_freq granularity (empty buckets = 0)."""
+    ts = ts[(ts >= start) & (ts <= end)]
+    freq = detail_freq(start, end)
+    # every bucket in the window, so gaps plot as zeros instead of being bridged by the line
+    buckets = pd.date_range(pd.Timestamp(start).floor(freq), end, freq=freq, name="Time")
+    counts = ts.dt.floor(freq).value_counts().reindex(buckets, fill_value=0)
+    return counts.rename(label).reset_index()
+
+
+# =================== RENDERING ===================
+def _zoom_from_event(event):
+    try:
+        boxes = event.selection["box"]
+    except Exception:
+        return None
+    if not boxes:
+        return None
+    x0, x1 = boxes[0]["x"][:2]
+    start, end = sorted([pd.to_datetime(x0), pd.to_datetime(x1)])
+    return start, end
+
+
+def render_trend(chart_id: str, df: pd.DataFrame, x: str, y: str, color: str,
+                 width_px: int = 900, detail=None, method: str = "lttb"):
+    """Area trend, downsampled to the chart width; box-select to zoom.
+
+    `detail(start, end)` returns a finer (Time, y) frame for a zoom window;
+    without it, zooming just narrows the current series.
+    """
+    px = lazy.load("plotly.express")
+    zkey = f"zoom_{chart_id}"
+    zoom = st.session_state.get(zkey)
+
+    if zoom is not None:
+        start, end = zoom
+        if detail is not None:
+            df = detail(start, end)
+            x = "Time"
+        else:
+            df = df[(df[x] >= start) & (df[x] <= end)]
+
+    plot_df = downsample(df, x, y, points_for_width(width_px), method)
+    shape = "spline" if len(plot_df) <= 400 else "linear"
+    fig = lazy.load("figures").get(f"trend.{chart_id}.{shape}", {"color": color}, plot_df[[x, y]], lambda d: (
+        px.area(d, x=x, y=y, color_discrete_sequence=[color])
+        .update_traces(mode="lines", line_shape=shape)
+        .update_layout(margin=dict(l=0, r=0, t=0, b=0), dragmode="select",
+                       paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
+    ))
+
+    profiler.figure(fig)
+    try:
+        event = st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False},
+                                key=chart_id, on_select="rerun", selection_mode="box")
+    except TypeError:
+        # Older Streamlit: no selection events -> plain, non-zoomable chart
+        st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
+        return
+
+    # The chart keeps its last box in widget state: only act on a box we haven't seen,
+    # otherwise "Reset zoom" would be undone by the stale selection on the next rerun.
+    new_zoom = _zoom_from_event(event)
+    if new_zoom is not None and new_zoom != st.session_state.get(f"{zkey}_seen"):
+        st.session_state[f"{zkey}_seen"] = new_zoom
+        st.session_state[zkey] = new_zoom
+        st.rerun()
+    if zoom is not None:
+        st.caption(f"Zoomed {zoom[0]:%Y-%m-%d} → {zoom[1]:%Y-%m-%d} · {len(df):,} points → {len(plot_df):,} drawn")
+        if st.button("Reset zoom", key=f"{zkey}_reset"):
+            del st.session_state[zkey]
+            st.rerun()
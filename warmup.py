@@ -0,0 +1,83 @@
+# warmup.py — precompute page aggregates for common filter states at startup
+#
+# Runs once per server process, right after load_data(). Results land in the
+# same memory/disk caches the pages read from (aggregates.compute), so the
+# first real request for these filter states is a cache hit. Tasks run on the
+# low-priority background pool; a request arriving while its filter state is
+# still warming joins that computation instead of queueing behind it.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import aggregates
+import risk
+from data import dataset_version, default_filters, filter_key, apply_filters
+
+# Saved presets, applied on top of the default ribbon state
+PRESETS = {
+    "Default":  {},
+    "SMS sent": {"sms": "Yes"},
+    "No SMS":   {"sms": "No"},
+    "Female":   {"genders": ("F",)},
+    "Male":     {"genders": ("M",)},
+}
+PAGES = ("overview", "patients", "appointments", "cohorts")
+WORKERS = 4
+ENABLED = os.environ.get("DASHBOARD_WARMUP", "1") != "0"     # benchmarks turn it off
+
+STATUS = {"total": 0, "done": 0, "failed": 0, "running": False}
+_LOCK = threading.Lock()
+_STARTED = set()       # dataset versions already warmed in this process
+_POOL = None
+
+
+def _warm(DF: pd.DataFrame, filters: dict):
+    F = apply_filters(DF, filters)
+    key = (dataset_version(DF), filter_key(filters))
+    for page in PAGES:
+        try:
+            dict(aggregates.compute(page, F, key, background=True))     # wait for every task
+        except Exception:
+            with _LOCK:
+                STATUS["failed"] += 1
+        else:
+            with _LOCK:
+                STATUS["done"] += 1
+    with _LOCK:
+        STATUS["running"] = STATUS["done"] + STATUS["failed"] < STATUS["total"]
+
+
+def start(DF: pd.DataFrame) -> dict:
+    """Kick off warm-up for DF (no-op if already started for this dataset version)."""
+    global _POOL
+    if not ENABLED:
+        return STATUS
+    version = dataset_version(DF)
+    with _LOCK:
+        if version in _STARTED:
+            return STATUS
+        _STARTED.add(version)
+        base = default_filters(DF)
+        states = [{**base, **overrides} for overrides in PRESETS.values()]
+        STATUS.update(total=len(states) * len(PAGES), done=0, failed=0, running=True)
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="warmup")
+    _POOL.submit(risk.get_model, DF)      # Risk page model (disk-cached per dataset version)
+    for filters in states:
+        _POOL.submit(_warm, DF, filters)
+    return STATUS
+
+
+def status_text() -> str:
+    with _LOCK:
+        s = dict(STATUS)
+    if not s["total"]:
+        return ""
+    if s["running"]:
+        return f"⏳ Warming caches… {s['done'] + s['failed']}/{s['total']}"
+    if s["failed"]:
+        return f"⚠️ Caches warm ({s['failed']} failed)"
+    return "✅ Caches warm"